@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""
+Measures how long it takes to build and render the list view for a large
+number of issues. Usage: python3 benchmarks/render.py [issues] [runs]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pyghi_cli.issue import Issue
+from pyghi_cli.registry import Registry
+
+class Master:
+    """ Stands in for PyGHI, which the models only need for the registry. """
+    def __init__(self):
+        self.registry = Registry(self)
+
+LABELS = [
+    {"id": 1, "name": "bug", "color": "fc2929"},
+    {"id": 2, "name": "enhancement", "color": "84b6eb"},
+    {"id": 3, "name": "question", "color": "cc317c"},
+    {"id": 4, "name": "wontfix", "color": "ffffff"}
+]
+USERS = [{"id": i, "login": "user%i" % (i)} for i in range(20)]
+MILESTONE = {
+    "id": 1,
+    "number": 1,
+    "title": "v1.0",
+    "state": "open",
+    "open_issues": 3,
+    "closed_issues": 7
+}
+
+def payload(number):
+    return {
+        "id": number,
+        "number": number,
+        "title": "Issue number %i" % (number),
+        "body": "Some description",
+        "state": "open" if number % 3 else "closed",
+        "user": USERS[number % len(USERS)],
+        "assignee": USERS[(number + 1) % len(USERS)] if number % 2 else None,
+        "labels": LABELS[:number % len(LABELS)],
+        "milestone": MILESTONE if number % 4 == 0 else None,
+        "comments": number % 5,
+        "created_at": "2015-01-01T00:00:00Z",
+        "updated_at": "2015-01-02T00:00:00Z"
+    }
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    issues = [payload(i) for i in range(1, count + 1)]
+
+    best = None
+    for run in range(runs):
+        start = time.perf_counter()
+        master = Master()
+        output = ""
+        for data in issues:
+            output += Issue(master, data).print_line()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+
+    print("Rendered %i issues in %.1f ms (best of %i)" % (
+        count,
+        best * 1000,
+        runs
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""
+Measures the cold-start time of pyghi subcommands, along with how much of it
+is spent importing modules (python -X importtime). Run it inside a git repo.
+Usage: python3 benchmarks/startup.py [runs] [command ...]
+Commands are quoted argument strings, e.g. "list --offline".
+"""
+
+import os
+import sys
+import time
+import shlex
+import subprocess
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "scripts", "pyghi")
+
+# Commands that don't need the network
+COMMANDS = [
+    "--help",
+    "list --help",
+    "show --help",
+    "list --offline",
+    "show 1 --offline"
+]
+
+def measure(command):
+    """ Returns wall time, import time and the slowest top-level import. """
+    env = dict(os.environ, PYTHONPATH=os.path.join(SCRIPT, "..", ".."))
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", SCRIPT] + shlex.split(command),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=env
+    )
+    elapsed = time.perf_counter() - start
+
+    # Top-level imports aren't indented, their cumulative times add up
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[12:].split("|")
+        if not name.startswith("  "):
+            imports.append((int(cumulative) / 1000000, name.strip()))
+
+    return elapsed, sum(x[0] for x in imports), max(imports, default=(0, ""))
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    commands = sys.argv[2:] or COMMANDS
+
+    print("%-20s %10s %10s   %s" % ("command", "total", "imports",
+        "slowest import"))
+    for command in commands:
+        results = [measure(command) for run in range(runs)]
+        elapsed, imports, slowest = min(results)
+        print("%-20s %7.1f ms %7.1f ms   %s (%.1f ms)" % (
+            command,
+            elapsed * 1000,
+            imports * 1000,
+            slowest[1],
+            slowest[0] * 1000
+        ))
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,12 @@ Module containing the classes needed for the PyGHI CLI
 import os
 import sys
 import time
+import types
 import platform
 import re
 import json
-import webbrowser
 import threading
-import argparse
 
-import requests
 if platform.system() == "Windows":
     import colorama
 
@@ -22,9 +20,17 @@ from .issue import Issue
 from .label import Label
 from .milestone import Milestone
 
-from .helpers import stylize, pager, get_terminal_size
-from .arguments import add_arguments
-from .stopwords import stopwords
+from .helpers import stylize, pager, get_terminal_size, StreamPager, \
+    format_size
+from .session import get_timeout, API_URL
+from .scheduler import Scheduler, RateLimitExceeded
+from .cache import ResponseCache, CachedResponse, cache_dir
+from .registry import Registry
+from .repo import resolve, RepoCache
+from .arguments import build_parser, COMMAND_NAMES
+
+# requests, asyncio, sqlite3 and friends take far longer to import than
+# most commands take to run, so they're only imported where needed.
 
 class PyGHI:
     """ Main PyGHI CLI class """
@@ -32,9 +38,13 @@ class PyGHI:
         if platform.system() == "Windows":
             colorama.init()
 
-        self.cwd = wd
+        # No spinner is running yet
+        self.stop_event = threading.Event()
+        self.stop_event.set()
+        self.spinner_lock = threading.Lock()
+        self.spinner_thread = None
+
         self.basedir = os.path.dirname(os.path.realpath(__file__))
-        self.stopwords = stopwords()
 
         # Load config
         configpath = os.path.join(os.path.expanduser("~"), ".pyghiconf")
@@ -46,93 +56,264 @@ class PyGHI:
             except:
                 self.log(1, "Couldn't parse config file.")
 
-        # Check for git repo
-        gitpath = None
-        try:
-            curpath = self.cwd
-            for i in range(20): # maximum depth
-                if os.path.isdir(os.path.join(curpath, ".git")):
-                    gitpath = os.path.join(curpath, ".git")
-                    break
-                if curpath == os.path.dirname(curpath): # reached root
-                    break
-                curpath = os.path.dirname(curpath)
-            assert(curpath != None)
-        except:
-            self.log(2, "Current directory is no git repo.")
-
-        # Get repository data
-        try:
-            gitconfigpath = os.path.join(gitpath, "config")
-            gitconfig = open(gitconfigpath, "r").read()
-
-            origin = re.match(
-                r".*?\[remote \"origin\"\].*?url = (.*?)\n",
-                gitconfig,
-                re.DOTALL
-            ).group(1)
-
-            match = re.match(
-                r".*?github\.com[/:]([a-zA-Z0-9-_]+)\/([a-zA-Z0-9-_]+)",
-                origin
+        # Shared keep-alive session for all API calls, created on first use
+        self._session = None
+        self._client = None
+        self.session_lock = threading.Lock()
+        self.timeout = get_timeout(self.config)
+        self.scheduler = Scheduler(self.config)
+        self.api_url = self.config.get("api_url", API_URL)
+
+        # On-disk response cache, revalidated with ETags
+        self.default_cache = None
+        if self.config.get("cache", True):
+            self.default_cache = ResponseCache(
+                cache_dir("http"),
+                int(self.config.get("cache_size", 50)) * 1024 * 1024
             )
+        self.repo_cache = RepoCache(cache_dir("repos.json"))
 
-            self.owner = match.group(1)
-            self.repo = match.group(2)
-        except:
-            self.log(2, "Couldn't extract GitHub URL.")
+        # Opened mirrors by path, the daemon reuses them between commands
+        self.mirrors = {}
+        self.interactive = True
 
-        # Parse Arguments
-        self.parser = None
-        add_arguments(self)
+        self.stats_lock = threading.Lock()
+        self._parser = None
+        self.reset(wd)
+
+    def reset(self, wd):
+        """
+        Prepares running a command in the working directory wd. Everything
+        that only lasts for one command is started over, connections and
+        caches are kept.
+        """
+        self.cwd = wd
+        self._github_repo = None
+        self.cache = self.default_cache
+        self.refresh = False
+        # Set by --format, the output is meant for programs then
+        self.output_format = None
+
+        # Statistics for --verbose
+        self.verbose = False
+        self.requests = 0
+        self.pages = 0
+        self.bytes = 0
+        # (type, items, requests and bytes skipped) when list filtered
+        # issues or PRs on the server
+        self.type_filter = None
+        self.scheduler.waited = 0.0
+
+        # Users, labels and milestones shared between issues
+        self.registry = Registry(self)
+
+        self._backend = None
+        self.backend_name = self.config.get("backend", "rest")
+
+    def github_repo(self):
+        """
+        Returns the owner and name of the GitHub repo of the working
+        directory, usually without touching the git config.
+        """
+        if self._github_repo == None:
+            try:
+                self._github_repo = resolve(
+                    self.cwd,
+                    self.config.get("remote"),
+                    self.repo_cache
+                )
+            except ValueError as e:
+                self.log(2, str(e))
+        return self._github_repo
+
+    @property
+    def owner(self):
+        return self.github_repo()[0]
+
+    @property
+    def repo(self):
+        return self.github_repo()[1]
+
+    @property
+    def parser(self):
+        """ The parser for all commands, built on first use. """
+        if self._parser == None:
+            self._parser = build_parser(self)
+        return self._parser
+
+    @property
+    def session(self):
+        with self.session_lock:
+            if self._session == None:
+                from .session import create_session
+                self._session = create_session(self.config)
+            return self._session
+
+    @property
+    def client(self):
+        """ The AsyncClient coroutines send their requests through. """
+        with self.session_lock:
+            if self._client == None:
+                from .aio import AsyncClient
+                self._client = AsyncClient(
+                    self,
+                    int(self.config.get("pool_size", 10))
+                )
+            return self._client
+
+    @property
+    def backend(self):
+        if self._backend == None:
+            from .backends import BACKENDS
+            self._backend = BACKENDS[self.backend_name](self)
+        return self._backend
 
     def parse_args(self, args=sys.argv[1:]):
         """ Parses given arguments. Default is sys.argv[1:] """
         if len(args) == 0:
             args = ["list"]
-        args = self.parser.parse_args(args)
-        args.func(args)
 
-    def get_json(self, url, params={}):
-        url = "https://api.github.com/" + url
-        try:
-            if "username" in self.config and "password" in self.config:
-                auth = (self.config["username"], self.config["password"])
-                r = requests.get(url, params=params, auth=auth)
-            else:
-                r = requests.get(url, params=params)
-
-            if r.status_code != 200:
-                self.log(2, "Couldn't connect to GitHub. Status Code: %i" % (
-                    r.status_code
+        # Only build the parser of the command that is run
+        command = next((x for x in args if x in COMMAND_NAMES), None)
+        args = build_parser(self, command).parse_args(args)
+        if args.nocache:
+            self.cache = None
+        self.refresh = args.refresh
+        self.backend_name = args.backend
+        self.verbose = args.verbose
+        self.output_format = getattr(args, "format", None)
+
+        # Network-bound commands are coroutines
+        result = args.func(args)
+        if isinstance(result, types.CoroutineType):
+            self.run(result)
+
+        if args.verbose:
+            self.log(0, "Requests: %i (%i pages, %s)" % (
+                self.requests,
+                self.pages,
+                format_size(self.bytes)
+            ))
+            if self.type_filter != None:
+                kind, skipped, requests, size = self.type_filter
+                self.log(0, "Type filter: skipped %i %s, about %i requests "
+                    "and %s" % (
+                    skipped,
+                    "issues" if kind == "prs" else "PRs",
+                    requests,
+                    format_size(size)
                 ))
+            self.log(0, "Objects: %s" % (self.registry.stats()))
+            if len(self.scheduler.limits) > 0:
+                self.log(0, "Rate limit: %s" % (self.scheduler.quota()))
+            if self.scheduler.waited > 0:
+                self.log(0, "Throttled: %.1fs" % (self.scheduler.waited))
+
+    def request(self, method, url, params=None, payload=None, headers=None):
+        """
+        Sends a request to the GitHub API through the shared session, paced
+        by the scheduler. Rate limited and transiently failed requests are
+        retried. Raises RateLimitExceeded rather than waiting longer than
+        max_wait for the quota.
+        """
+        data = json.dumps(payload) if payload != None else None
+        if not re.match(r"https?://", url):
+            url = self.api_url + url
+
+        attempt = 0
+        while True:
+            self.scheduler.acquire()
+            with self.stats_lock:
+                self.requests += 1
+            r = self.session.request(
+                method,
+                url,
+                params=params,
+                data=data,
+                headers=headers,
+                timeout=self.timeout
+            )
+            self.scheduler.update(r)
+            with self.stats_lock:
+                self.bytes += len(r.content)
+
+            delay = self.scheduler.retry_delay(r, attempt)
+            if delay == None:
+                return r
+            self.scheduler.pause(delay)
+            attempt += 1
+
+    def get_response(self, url, params={}):
+        """
+        Sends a GET request and quits unless GitHub answers with 200.
+        Cached responses are revalidated and replayed on 304.
+        """
+        key, entry, headers = None, None, {}
+        if self.cache != None:
+            key = self.cache.key(url, params, self.config.get("username"))
+            if not self.refresh:
+                entry = self.cache.load(key)
+            if entry != None:
+                headers = self.cache.validators(entry)
 
-            return r.json()
+        try:
+            r = self.request("GET", url, params=params, headers=headers)
+        except RateLimitExceeded as e:
+            self.log(2, str(e))
+        except SystemExit:
+            raise
         except:
             self.log(2, "Couldn't connect to GitHub.")
 
-    def patch_json(self, url, payload={}):
-        url = "https://api.github.com/" + url
+        if r.status_code == 304 and entry != None:
+            return CachedResponse(entry)
+        if r.status_code == 200 and key != None:
+            self.cache.store(key, r)
 
+        if r.status_code in (403, 429) and \
+                r.headers.get("X-RateLimit-Remaining") == "0":
+            self.log(2, str(RateLimitExceeded(
+                r.headers.get("X-RateLimit-Reset", 0)
+            )))
+        if r.status_code != 200:
+            self.log(2, "Couldn't connect to GitHub. Status Code: %i" % (
+                r.status_code
+            ))
+
+        return r
+
+    def get_json(self, url, params={}):
+        try:
+            return self.get_response(url, params).json()
+        except SystemExit:
+            raise
+        except:
+            self.log(2, "Couldn't parse GitHub response.")
+
+    def patch_json(self, url, payload={}):
         if not "username" in self.config or not "password" in self.config:
             self.log(2, "You are not authorized to do that.")
 
-        auth = (self.config["username"], self.config["password"])
-        r = requests.patch(url, auth=auth, data=json.dumps(payload))
+        try:
+            r = self.request("PATCH", url, payload=payload)
+        except RateLimitExceeded as e:
+            self.log(2, str(e))
 
         if r.status_code != 200:
             self.log(2, "Couldn't connect to GitHub. Status Code: %i" % (
                 r.status_code
             ))
 
-    def post_json(self, url, payload={}):
-        url = "https://api.github.com/" + url
+        return r.json()
 
+    def post_json(self, url, payload={}):
         if not "username" in self.config or not "password" in self.config:
             self.log(2, "You are not authorized to do that.")
 
-        auth = (self.config["username"], self.config["password"])
-        r = requests.post(url, auth=auth, data=json.dumps(payload))
+        try:
+            r = self.request("POST", url, payload=payload)
+        except RateLimitExceeded as e:
+            self.log(2, str(e))
 
         if r.status_code != 201:
             self.log(2, "Couldn't connect to GitHub. Status Code: %i" % (
@@ -151,47 +332,114 @@ class PyGHI:
             stylize("WARNING:", fg=0xFFFF00, bold=True),
             stylize("ERROR:", fg=0xFF0000, bold=True)
         ]
-        print(prefixes[level], message)
+        if level == 2:
+            # Clear the spinner first so it doesn't garble the message
+            self.clear_spinner()
+
+        # Keep stdout clean for the records of --format
+        print(prefixes[level], message,
+            file=sys.stderr if self.output_format != None else sys.stdout)
 
         if level == 2:
-            try:
-                self.stop_event.set()
-            except:
-                pass
             sys.exit(1)
 
+    def run(self, coroutine):
+        """ Runs a coroutine on a fresh event loop and returns its result. """
+        import asyncio
+        from .aio import WorkerExit
+        try:
+            return asyncio.run(coroutine)
+        except WorkerExit as e:
+            sys.exit(e.code)
+
+    def spinner_frame(self, i):
+        """ Prints frame i of the spinner, unless it has been stopped. """
+        output = [
+            stylize("[", bold=True),
+            stylize(":", fg=0xFFFF00),
+            stylize(":", fg=0xFFFF00),
+            stylize(":", fg=0xFFFF00),
+            stylize(":", fg=0xFFFF00),
+            stylize(":", fg=0xFFFF00),
+            stylize("]", bold=True)
+        ]
+        output[i+1] = stylize("|", fg=0x00FF00, bold=True)
+        with self.spinner_lock:
+            if not self.stop_event.is_set():
+                print("".join(output), end="\r")
+
     def spinner(self):
         i = 0
         while not self.stop_event.is_set():
-            output = [
-                stylize("[", bold=True),
-                stylize(":", fg=0xFFFF00),
-                stylize(":", fg=0xFFFF00),
-                stylize(":", fg=0xFFFF00),
-                stylize(":", fg=0xFFFF00),
-                stylize(":", fg=0xFFFF00),
-                stylize("]", bold=True)
-            ]
-            output[i+1] = stylize("|", fg=0x00FF00, bold=True)
-            print("".join(output), end="\r")
+            self.spinner_frame(i)
             i = (i+1) % 5
             time.sleep(0.1)
 
-        # Clear line
-        cols, rows = get_terminal_size()
-        print(" "*cols, end="\r")
+    async def async_spinner(self):
+        import asyncio
+        i = 0
+        while not self.stop_event.is_set():
+            self.spinner_frame(i)
+            i = (i+1) % 5
+            await asyncio.sleep(0.1)
 
     def start_spinner(self):
-        self.stop_event = threading.Event()
-        thread = threading.Thread(target=self.spinner)
-        thread.start()
+        """
+        Starts the spinner, as a task on the event loop when called from a
+        coroutine and in a thread otherwise.
+        """
+        if not self.interactive or self.output_format != None:
+            return
+        self.stop_event.clear()
+        try:
+            # No loop can be running if asyncio was never imported
+            loop = sys.modules["asyncio"].get_running_loop()
+        except (KeyError, RuntimeError):
+            self.spinner_thread = threading.Thread(
+                target=self.spinner,
+                daemon=True
+            )
+            self.spinner_thread.start()
+        else:
+            self.spinner_thread = None
+            loop.create_task(self.async_spinner())
+
+    def clear_spinner(self):
+        """ Stops the spinner and clears its line, if it is running. """
+        with self.spinner_lock:
+            if self.stop_event.is_set():
+                return
+            self.stop_event.set()
+            cols, rows = get_terminal_size()
+            print(" "*cols, end="\r")
 
     def stop_spinner(self):
-        self.stop_event.set()
+        """ Stops the spinner once it has cleared its line. """
+        self.clear_spinner()
+        if self.spinner_thread != None:
+            self.spinner_thread.join()
+            self.spinner_thread = None
+
+    async def list(self, args):
+        state = args.state or "open"
+        tree, keys = None, None
+        if args.where != None or args.sort != None:
+            from . import query
+            try:
+                if args.where != None:
+                    tree = query.parse(args.where)
+                    # Don't hide the matches of state:closed by default
+                    if args.state == None and query.constrains_state(tree):
+                        state = "all"
+                if args.sort != None:
+                    keys = query.parse_sort(args.sort)
+            except ValueError as e:
+                self.log(2, str(e))
+        if args.format != None and args.duplicates:
+            self.log(2, "--format can't be combined with --duplicates.")
 
-    def list(self, args):
         params = {
-            "state": args.state,
+            "state": state,
             "milestone": args.milestone,
             "labels": args.labels,
             "assignee": args.assignee,
@@ -200,7 +448,7 @@ class PyGHI:
         }
         params = {k: v for k, v in params.items() if v != None}
 
-        statestr = args.state[0].upper() + args.state[1:]
+        statestr = state[0].upper() + state[1:]
         heading = "%s Issues for %s/%s" % (
             statestr,
             self.owner,
@@ -215,40 +463,123 @@ class PyGHI:
             heading += ", assigned to %s" % (params["assignee"])
         if args.creator:
             heading += ", created by %s" % (params["creator"])
-
-        print(stylize(heading + ":", fg=0x00FF00, bold=True))
+        if args.where:
+            heading += ", where %s" % (args.where)
+        if args.sort:
+            heading += ", sorted by %s" % (args.sort)
+
+        if args.format == None:
+            print(stylize(heading + ":", fg=0x00FF00, bold=True))
+
+        # Let the server sort and filter as far as it can
+        server_sort = None
+        if tree != None:
+            query.pushdown(tree, params)
+        if keys != None and not args.offline and self.backend_name == "rest":
+            server_sort = query.sort_params(keys)
+            if server_sort != None:
+                params.update(server_sort)
+
+        # Don't download more than we show, unless it's filtered or sorted
+        # locally
+        if args.limit != None and tree == None and args.type == None and \
+                (keys == None or server_sort != None) and not args.duplicates:
+            params["per_page"] = max(1, min(100, args.limit))
 
         self.start_spinner()
 
-        url = "repos/%s/%s/issues" % (self.owner, self.repo)
-        issues = []
-        for i in range(1, 20):
-            params["page"] = i
-            last = self.get_json(url, params)
-            if len(last) == 0:
-                break
-            issues += last
+        from .aio import iterate, filter_pages
+        if args.offline:
+            pages = iterate([self.open_mirror().issues(params)])
+        else:
+            pages = self.backend.issue_pages(
+                params,
+                args.jobs,
+                args.type,
+                args.duplicates
+            )
 
-        self.stop_spinner()
+        if args.type in ("issues", "prs"):
+            prs = args.type == "prs"
+            pages = filter_pages(pages, lambda x: ("pull_request" in x) == prs)
+        if tree != None:
+            pages = filter_pages(pages, query.compile_tree(tree))
+        if keys != None and server_sort == None:
+            issues = []
+            async for page in pages:
+                issues += page
+            pages = iterate([query.sort(issues, keys)])
+
+        if args.duplicates:
+            issues = []
+            async for page in pages:
+                issues += map(lambda x: Issue(self, x), page)
+            if args.limit != None:
+                issues = issues[:args.limit]
+
+            self.stop_spinner()
+            return self.print_duplicates(issues, args)
+
+        # Render every page as soon as it arrives
+        stream, writer = None, None
+        if args.format != None:
+            from .formats import RecordWriter, ISSUE_COLUMNS
+            writer = RecordWriter(args.format, ISSUE_COLUMNS)
+        results = 0
+        async for page in pages:
+            if args.limit != None:
+                page = page[:args.limit - results]
+            results += len(page)
+
+            if writer != None:
+                writer.write_all(page)
+            else:
+                if stream == None:
+                    self.stop_spinner()
+                    stream = StreamPager()
+                for issue in page:
+                    stream.write(Issue(self, issue).print_line(
+                        args.shortlabels,
+                        args.nolabels,
+                        args.nocomments
+                    ))
+
+            if results == args.limit:
+                # Stops fetching the pages that were requested ahead
+                await pages.aclose()
+                break
 
-        issues = list(map(lambda x: Issue(self, x), issues))
-        if args.type == "issues":
-            issues = list(filter(lambda x: not x.is_pr, issues))
-        if args.type == "prs":
-            issues = list(filter(lambda x: x.is_pr, issues))
-
-        output = "No results." if len(issues) == 0 else ""
-        for issue in issues:
-            output += issue.print_line(
-                args.shortlabels,
-                args.nolabels,
-                args.nocomments
-            )
+        if writer != None:
+            return
+        if stream == None:
+            self.stop_spinner()
+            stream = StreamPager()
+        if results == 0:
+            stream.write("No results.")
+        stream.close()
+
+    def print_duplicates(self, issues, args):
+        from .duplicates import find_duplicates
+        from .stopwords import stopwords
+        clusters = find_duplicates(issues, stopwords(), args.threshold)
+
+        output = "No potential duplicates found." if len(clusters) == 0 else ""
+        for score, cluster in clusters:
+            output += stylize("%i%% similar:" % (score * 100), bold=True)
+            output += "\n"
+            for issue in cluster:
+                output += issue.print_line(
+                    args.shortlabels,
+                    args.nolabels,
+                    args.nocomments
+                )
+            output += "\n"
 
         pager(output)
 
-    def show(self, args):
+    async def show(self, args):
         if args.browser:
+            import webbrowser
             savout = os.dup(1)
             os.close(1)
             os.open(os.devnull, os.O_RDWR)
@@ -263,31 +594,196 @@ class PyGHI:
                 sys.exit()
 
         heading = "Issue #%i in %s/%s:" % (args.issueid, self.owner, self.repo)
+        if args.format == None:
+            print(stylize(heading, fg=0x00FF00, bold=True))
+
+        if args.offline:
+            mirror = self.open_mirror()
+            issue = mirror.issue(args.issueid)
+            if issue == None:
+                self.log(2, "Issue #%i is not in the local mirror." % (
+                    args.issueid
+                ))
+            comments = mirror.comments(args.issueid)
+        else:
+            self.start_spinner()
+            issue, comments = await self.backend.issue(args.issueid, args.jobs)
+            self.stop_spinner()
+
+        if args.format != None:
+            from .formats import RecordWriter, post_columns
+            writer = RecordWriter(args.format, post_columns(issue["number"]))
+            return writer.write_all([issue] + comments)
+
+        pager(Issue(self, issue, comments).print_detail())
+
+    def print_issue(self, issue, comments):
+        """ Shows an issue payload, e.g. the result of a write command. """
+        heading = "Issue #%i in %s/%s:" % (
+            issue["number"],
+            self.owner,
+            self.repo
+        )
+        print(stylize(heading, fg=0x00FF00, bold=True))
+
+        pager(Issue(self, issue, comments).print_detail())
+
+    def open_mirror(self, synced=True):
+        """ Opens the local mirror of the repo, optionally requiring a sync. """
+        from .mirror import Mirror
+        path = cache_dir("mirror", "%s_%s.db" % (self.owner, self.repo))
+        if path not in self.mirrors:
+            self.mirrors[path] = Mirror(path)
+        mirror = self.mirrors[path]
+        if synced and not mirror.is_synced():
+            self.log(2, "No local mirror yet. Run 'pyghi sync' first.")
+        return mirror
+
+    def sync(self, args):
+        heading = "Syncing issues for %s/%s:" % (self.owner, self.repo)
         print(stylize(heading, fg=0x00FF00, bold=True))
 
+        mirror = self.open_mirror(False)
+        params = {
+            "state": "all",
+            "sort": "updated",
+            "direction": "asc",
+            "per_page": 100
+        }
+
+        async def fetch(url, params, store):
+            """
+            Stores the pages of a resource as they come in. Returns how many
+            items there were and when the newest was updated.
+            """
+            count, since = 0, None
+            async for page in self.client.pages(url, params, args.jobs):
+                store(page)
+                count += len(page)
+                since = max([x["updated_at"] for x in page] + [since or ""])
+            return count, since
+
         self.start_spinner()
 
-        url = "repos/%s/%s/issues/%i" % (self.owner, self.repo, args.issueid)
-        issue = self.get_json(url, {})
-        url += "/comments"
-        comments = self.get_json(url, {})
+        # Only fetch what changed since the newest update we've seen
+        url = "repos/%s/%s/issues" % (self.owner, self.repo)
+        if mirror.get_meta("issues_since") != None:
+            params["since"] = mirror.get_meta("issues_since")
+        issues, since = self.run(fetch(url, params, mirror.store_issues))
+        if since != None:
+            mirror.set_meta("issues_since", since)
+
+        url = "repos/%s/%s/issues/comments" % (self.owner, self.repo)
+        params = {"sort": "updated", "direction": "asc", "per_page": 100}
+        if mirror.get_meta("comments_since") != None:
+            params["since"] = mirror.get_meta("comments_since")
+        comments, since = self.run(fetch(url, params, mirror.store_comments))
+        if since != None:
+            mirror.set_meta("comments_since", since)
+
+        mirror.set_meta("synced_at", time.strftime("%Y-%m-%dT%H:%M:%SZ",
+            time.gmtime()))
+        self.search_index(mirror).update()
 
         self.stop_spinner()
 
-        issue = Issue(self, issue, comments)
+        print("Updated %i %s and %i %s." % (
+            issues,
+            "issue" if issues == 1 else "issues",
+            comments,
+            "comment" if comments == 1 else "comments"
+        ))
+
+    def search_index(self, mirror):
+        """ Returns the search index stored alongside a mirror. """
+        from .search import SearchIndex
+        from .stopwords import stopwords
+        return SearchIndex(mirror, stopwords())
+
+    def search(self, args):
+        query = " ".join(args.query)
+        heading = "Issues matching '%s' in %s/%s:" % (
+            query,
+            self.owner,
+            self.repo
+        )
+        print(stylize(heading, fg=0x00FF00, bold=True))
+
+        mirror = self.open_mirror()
+        index = self.search_index(mirror)
+        # Mirrors synced before the index existed are indexed once here
+        index.update()
+        results = index.search(query, args.count, args.state)
+
+        output = "No matching issues found." if len(results) == 0 else ""
+        for number, score in results:
+            output += "%s %s" % (
+                stylize(("%.1f" % (score)).rjust(5), bold=True),
+                Issue(self, mirror.issue(number)).print_line()
+            )
 
-        pager(issue.print_detail())
+        pager(output)
+
+    def similar(self, args):
+        try:
+            from .similar import TfidfIndex
+        except ImportError:
+            self.log(2, "Similarity search requires numpy.")
+
+        heading = "Issues similar to #%i in %s/%s:" % (
+            args.issueid,
+            self.owner,
+            self.repo
+        )
+        print(stylize(heading, fg=0x00FF00, bold=True))
+
+        self.start_spinner()
+
+        # Prefer the local mirror, fall back to fetching every issue
+        issues = None
+        mirror = self.open_mirror(False)
+        if mirror.is_synced():
+            fingerprint = mirror.fingerprint()
+            lookup = mirror.issue
+        else:
+            url = "repos/%s/%s/issues" % (self.owner, self.repo)
+            params = {"state": "all", "per_page": 100}
+            issues = self.run(self.client.all_pages(url, params, args.jobs))
+            fingerprint = "%i:%s" % (
+                len(issues),
+                max([x["updated_at"] for x in issues] or [None])
+            )
+            lookup = {x["number"]: x for x in issues}.get
+
+        # Reuse the vectors from last time unless the issues changed
+        path = cache_dir("tfidf", "%s_%s.npz" % (self.owner, self.repo))
+        index = TfidfIndex.load(path, fingerprint)
+        if index == None:
+            if issues == None:
+                issues = mirror.issues({"state": "all"})
+            from .stopwords import stopwords
+            index = TfidfIndex.build(issues, stopwords())
+            index.save(path, fingerprint)
+
+        results = index.similar(args.issueid, args.count)
+
+        self.stop_spinner()
+
+        if results == None:
+            self.log(2, "Issue #%i doesn't exist." % (args.issueid))
+
+        output = "No similar issues found." if len(results) == 0 else ""
+        for number, score in results:
+            output += "%s %s" % (
+                stylize(("%i%%" % (score * 100)).rjust(4), bold=True),
+                Issue(self, lookup(number)).print_line()
+            )
+
+        pager(output)
 
     def edit(self, args):
-        payload = {
-            "title": args.title,
-            "body": args.body,
-            "assignee": args.assignee if args.assignee != "none" else "",
-            "state": args.state,
-            "milestone": args.milestone,
-            "labels": args.labels
-        }
-        payload = {k: v for k, v in payload.items() if v != None}
+        from .batch import edit_payload
+        payload = edit_payload(args)
 
         if len(payload) == 0:
             nargs = self.parser.parse_args(["edit", "-h"])
@@ -296,12 +792,19 @@ class PyGHI:
         self.start_spinner()
 
         url = "repos/%s/%s/issues/%i" % (self.owner, self.repo, args.issueid)
-        self.patch_json(url, payload)
+        issue = self.patch_json(url, payload)
+
+        # The response already is the updated issue
+        comments = []
+        if issue["comments"] > 0:
+            comments = self.run(self.backend.comments(
+                args.issueid,
+                self.config.get("jobs", 4)
+            ))
 
         self.stop_spinner()
 
-        nargs = self.parser.parse_args(["show", str(args.issueid)])
-        return nargs.func(nargs)
+        self.print_issue(issue, comments)
 
     def open(self, args):
         args = ["edit", str(args.issueid), "-s", "open"]
@@ -330,12 +833,11 @@ class PyGHI:
         self.start_spinner()
 
         url = "repos/%s/%s/issues" % (self.owner, self.repo)
-        result = Issue(self, self.post_json(url, params))
+        issue = self.post_json(url, params)
 
         self.stop_spinner()
 
-        nargs = self.parser.parse_args(["show", str(result.number)])
-        return nargs.func(nargs)
+        self.print_issue(issue, [])
 
     def comment(self, args):
         self.start_spinner()
@@ -347,20 +849,125 @@ class PyGHI:
         )
         self.post_json(url, {"body": args.comment})
 
+        issue, comments = self.run(self.backend.issue(
+            args.issueid,
+            self.config.get("jobs", 4)
+        ))
+
         self.stop_spinner()
 
-        nargs = self.parser.parse_args(["show", str(args.issueid)])
-        return nargs.func(nargs)
+        self.print_issue(issue, comments)
+
+    def batch(self, args):
+        """
+        Applies a stream of edit, open, close, assign, create and comment
+        operations concurrently through the shared session, without
+        printing every updated issue.
+        """
+        if not "username" in self.config or not "password" in self.config:
+            self.log(2, "You are not authorized to do that.")
+
+        import requests
+        from concurrent.futures import ThreadPoolExecutor
+        from .batch import parse_operation, mutation
+
+        # Parse everything first so a typo doesn't leave a batch half done
+        operations = []
+        for i, line in enumerate(args.file, 1):
+            try:
+                op = parse_operation(line, self.parser)
+                if op != None:
+                    operations.append(mutation(op, self.owner, self.repo))
+            except ValueError as e:
+                self.log(2, "Line %i: %s" % (i, e))
+
+        # Once the quota is gone, the remaining operations aren't tried
+        stopped = []
+        def apply(operation):
+            method, url, payload, description, number = operation
+            if len(stopped) > 0:
+                return description, "not run, %s" % (stopped[0])
+            try:
+                r = self.request(method, url, payload=payload)
+            except RateLimitExceeded as e:
+                stopped.append(str(e))
+                return description, str(e)
+            except SystemExit:
+                stopped.append("aborted")
+                return description, "aborted"
+            except requests.exceptions.RequestException as e:
+                return description, str(e)
+            if r.status_code in (200, 201):
+                return description, None
+            return description, "Status Code: %i" % (r.status_code)
+
+        # Operations on the same issue run in order, different issues
+        # concurrently
+        queues = {}
+        for i, operation in enumerate(operations):
+            key = operation[4] if operation[4] != None else ("create", i)
+            queues.setdefault(key, []).append(i)
+
+        results = [None] * len(operations)
+        def run(queue):
+            for i in queue:
+                results[i] = apply(operations[i])
+
+        self.start_spinner()
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            list(executor.map(run, queues.values()))
+        self.stop_spinner()
+
+        failed = 0
+        for description, error in results:
+            if error == None:
+                print("%s %s" % (stylize("OK", fg=0x00FF00, bold=True),
+                    description))
+            else:
+                failed += 1
+                print("%s %s (%s)" % (stylize("FAILED", fg=0xFF0000,
+                    bold=True), description, error))
+
+        print(stylize("%i succeeded, %i failed." % (
+            len(results) - failed,
+            failed
+        ), bold=True))
+        if failed > 0:
+            sys.exit(1)
+
+    def daemon(self, args):
+        from .daemon import serve, request, socket_path
+
+        if args.stop:
+            try:
+                request(socket_path(), {"stop": True})
+            except (OSError, ValueError):
+                self.log(2, "The daemon isn't running.")
+            return
 
-    def milestone(self, args):
+        print(stylize("Running commands sent to %s" % (socket_path()),
+            fg=0x00FF00, bold=True))
+        sys.stdout.flush()
+        serve(self, socket_path(), args.idle * 60 if args.idle > 0 else None)
+
+    async def milestone(self, args):
         statstr = args.state[0].upper() + args.state[1:]
         heading = "%s Milestones for %s/%s:" % (statstr, self.owner, self.repo)
+        url = "repos/%s/%s/milestones" % (self.owner, self.repo)
+        params = {"state": args.state, "per_page": 100}
+
+        if args.format != None:
+            from .formats import RecordWriter, MILESTONE_COLUMNS
+            writer = RecordWriter(args.format, MILESTONE_COLUMNS)
+            async for page in self.client.pages(url, params):
+                writer.write_all(page)
+            return
+
         print(stylize(heading, fg=0x00FF00, bold=True))
 
         self.start_spinner()
 
-        url = "repos/%s/%s/milestones" % (self.owner, self.repo)
-        milestones = self.get_json(url, {"state": args.state, "per_page": 100})
+        milestones = await self.client.all_pages(url, params)
         milestones = list(map(lambda x: Milestone(self, x), milestones))
 
         self.stop_spinner()
@@ -373,18 +980,25 @@ class PyGHI:
 
         pager(output)
 
-    def label(self, args):
+    async def label(self, args):
         heading = "Labels for %s/%s:" % (self.owner, self.repo)
+        url = "repos/%s/%s/labels" % (self.owner, self.repo)
+
+        if args.format != None:
+            from .formats import RecordWriter, LABEL_COLUMNS
+            writer = RecordWriter(args.format, LABEL_COLUMNS)
+            async for page in self.client.pages(url, {"per_page": 100}):
+                writer.write_all(page)
+            return
+
         print(stylize(heading, fg=0x00FF00, bold=True))
 
-        self.stop_event = threading.Event()
-        thread = threading.Thread(target=self.spinner)
-        thread.start()
+        self.start_spinner()
 
-        url = "repos/%s/%s/labels" % (self.owner, self.repo)
-        labels = self.get_json(url, {})
+        labels = await self.client.all_pages(url, {"per_page": 100})
         labels = list(map(lambda x: Label(self, x), labels))
-        self.stop_event.set()
+
+        self.stop_spinner()
 
         output = ""
         if len(labels) == 0:
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import CachedResponse
+from .session import last_page
+
+# Marks an exhausted stream in merge
+DONE = object()
+
+class WorkerExit(Exception):
+    """ A blocking call quit with sys.exit, usually through log(2). """
+    def __init__(self, code):
+        Exception.__init__(self, code)
+        self.code = code
+
+class AsyncClient:
+    """
+    Lets coroutines on one event loop keep many requests in flight. The
+    blocking request layer (session, cache and scheduler) runs on a pool of
+    worker threads, the loop only waits for the results.
+    """
+    def __init__(self, master, workers=10):
+        self.master = master
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    async def call(self, func, *args):
+        """ Runs a blocking function on the worker pool. """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        except SystemExit as e:
+            # Escaping the task as SystemExit would stop the loop dead
+            raise WorkerExit(e.code)
+
+    async def get_json(self, url, params={}):
+        return await self.call(self.master.get_json, url, params)
+
+    async def pages(self, url, params={}, jobs=4, maxpages=None):
+        """
+        Yields the pages of a paginated resource in order, all of them
+        unless maxpages is given. Once the first response tells us how many
+        there are, up to jobs of the following pages are fetched ahead of
+        the consumer, so memory stays bounded however many there are.
+        Without a rel="last" link, rel="next" is followed one by one.
+        """
+        params = dict(params, page=1)
+        response = await self.call(self.master.get_response, url, params)
+        # The Link header of a replayed page may be older than its body's
+        # ETag, pages added since then have to be looked for
+        replayed = isinstance(response, CachedResponse)
+        result = response.json()
+        self.master.pages += 1
+        yield result
+
+        last = last_page(response)
+        count = 1
+        if last == 1:
+            while "next" in response.links and count != maxpages:
+                response = await self.call(
+                    self.master.get_response,
+                    response.links["next"]["url"],
+                    {}
+                )
+                replayed = isinstance(response, CachedResponse)
+                result = response.json()
+                self.master.pages += 1
+                count += 1
+                yield result
+            if "next" in response.links:
+                return
+        else:
+            if maxpages != None:
+                last = min(last, maxpages)
+
+            window = deque()
+            page = 2
+            try:
+                while page <= last or len(window) > 0:
+                    while page <= last and len(window) < max(1, jobs):
+                        window.append(asyncio.ensure_future(
+                            self.get_json(url, dict(params, page=page))
+                        ))
+                        page += 1
+                    result = await window.popleft()
+                    self.master.pages += 1
+                    count += 1
+                    yield result
+            finally:
+                for task in window:
+                    task.cancel()
+
+        # Only a full page can be followed by more
+        size = int(params.get("per_page", 30))
+        while replayed and isinstance(result, list) and \
+                len(result) >= size and count != maxpages:
+            count += 1
+            result = await self.get_json(url, dict(params, page=count))
+            self.master.pages += 1
+            if len(result) == 0:
+                return
+            yield result
+
+    async def all_pages(self, url, params={}, jobs=4, maxpages=None):
+        """ Returns the items of all pages of a paginated resource. """
+        items = []
+        async for page in self.pages(url, params, jobs, maxpages):
+            items += page
+        return items
+
+async def iterate(iterable):
+    """ Turns a plain iterable into an async one. """
+    for item in iterable:
+        yield item
+
+async def filter_pages(pages, function):
+    """ Drops the items function rejects from every page. """
+    async for page in pages:
+        yield list(filter(function, page))
+
+async def next_item(stream):
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return DONE
+
+async def merge(streams, key):
+    """
+    Merges async streams that are each sorted by key, largest first. The
+    first item of every stream is fetched concurrently.
+    """
+    heads = await asyncio.gather(*map(next_item, streams))
+    while True:
+        live = [i for i, x in enumerate(heads) if x is not DONE]
+        if len(live) == 0:
+            return
+        i = max(live, key=lambda i: key(heads[i]))
+        yield heads[i]
+        heads[i] = await next_item(streams[i])
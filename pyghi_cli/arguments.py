@@ -2,16 +2,63 @@
 
 import argparse
 
-def add_arguments(master):
-    master.parser = argparse.ArgumentParser(
+def build_parser(master, command=None):
+    """
+    Builds the argument parser. If command is given and known, only its
+    subparser is built, that's all a single invocation needs.
+    """
+    parser = argparse.ArgumentParser(
         formatter_class=lambda prog: argparse.HelpFormatter(
             prog,
             max_help_position=20
         )
     )
-    subparsers = master.parser.add_subparsers()
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="print statistics after the command"
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="nocache",
+        action="store_true",
+        help="don't read or write the local response cache"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="ignore cached responses and fetch everything again"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["rest", "graphql"],
+        default=master.config.get("backend", "rest"),
+        help="API used to fetch issues for list and show"
+    )
+    subparsers = parser.add_subparsers()
+
+    for name, add in COMMANDS:
+        if command == name or command not in COMMAND_NAMES:
+            add(master, subparsers)
 
-    # LIST ARGUMENTS
+    return parser
+
+def limit(text):
+    """ Parses a number of results, which can't be negative. """
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError("must be 0 or more, not %i" % (value))
+    return value
+
+def add_format(parser):
+    """ Adds --format, for output that is read by programs. """
+    parser.add_argument(
+        "--format",
+        choices=["jsonl", "csv", "tsv"],
+        help="print plain records in this format instead"
+    )
+
+def add_list(master, subparsers):
     parser_list = subparsers.add_parser(
         "list",
         formatter_class=lambda prog: argparse.HelpFormatter(
@@ -27,8 +74,7 @@ def add_arguments(master):
         type=str,
         choices=["open", "closed", "all"],
         metavar="STATE",
-        default="open",
-        help="show issues of this state"
+        help="show issues of this state (default: open)"
     )
     parser_list_state.add_argument(
         "--closed",
@@ -105,11 +151,37 @@ def add_arguments(master):
         help="show only PRs (no issues)"
     )
     
+    parser_list.add_argument(
+        "-w", "--where",
+        metavar="EXPR",
+        help="show issues matching this filter expression, e.g. "
+            "'label:bug OR label:crash AND updated<7d'"
+    )
+    parser_list.add_argument(
+        "--sort",
+        metavar="KEYS",
+        help="sort by created, updated, comments, number or title, "
+            "comma-separated, each optionally suffixed with -asc"
+    )
+
+    parser_list.add_argument(
+        "-n", "--limit",
+        type=limit,
+        metavar="N",
+        help="show at most N issues"
+    )
+
     parser_list.add_argument(
         "--duplicates",
         action="store_true",
         help="detect potential duplicates"
     )
+    parser_list.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="minimum similarity (0-1) for --duplicates"
+    )
     
     parser_list_lprint = parser_list.add_mutually_exclusive_group()
     parser_list_lprint.add_argument(
@@ -128,10 +200,25 @@ def add_arguments(master):
         action="store_true",
         help="don't print comment count"
     )
+
+    parser_list.add_argument(
+        "-j", "--jobs",
+        type=int,
+        metavar="N",
+        default=master.config.get("jobs", 4),
+        help="fetch up to N pages concurrently"
+    )
+
+    parser_list.add_argument(
+        "--offline",
+        action="store_true",
+        help="list issues from the local mirror (see sync)"
+    )
     
+    add_format(parser_list)
     parser_list.set_defaults(func=master.list)
 
-    # SHOW ARGUMENTS
+def add_show(master, subparsers):
     parser_show = subparsers.add_parser(
         "show",
         description="Show a specific issue"
@@ -145,9 +232,78 @@ def add_arguments(master):
         action="store_true",
         default=False
     )
+    parser_show.add_argument(
+        "--offline",
+        action="store_true",
+        help="show the issue from the local mirror (see sync)"
+    )
+    parser_show.add_argument(
+        "-j", "--jobs",
+        type=int,
+        metavar="N",
+        default=master.config.get("jobs", 4),
+        help="fetch up to N pages of comments concurrently"
+    )
+
+    add_format(parser_show)
     parser_show.set_defaults(func=master.show)
 
-    # EDIT ARGUMENTS
+def add_sync(master, subparsers):
+    parser_sync = subparsers.add_parser(
+        "sync",
+        description="Update the local mirror of the repo's issues"
+    )
+    parser_sync.add_argument(
+        "-j", "--jobs",
+        type=int,
+        metavar="N",
+        default=master.config.get("jobs", 4),
+        help="fetch up to N pages concurrently"
+    )
+    parser_sync.set_defaults(func=master.sync)
+
+def add_search(master, subparsers):
+    parser_search = subparsers.add_parser(
+        "search",
+        description="Search the issues and comments of the local mirror"
+    )
+    parser_search.add_argument("query", nargs="+")
+    parser_search.add_argument(
+        "-n", "--count",
+        type=int,
+        default=20,
+        help="number of issues to show"
+    )
+    parser_search.add_argument(
+        "-s", "--state",
+        choices=["open", "closed", "all"],
+        default="all",
+        help="only search open or closed issues"
+    )
+    parser_search.set_defaults(func=master.search)
+
+def add_similar(master, subparsers):
+    parser_similar = subparsers.add_parser(
+        "similar",
+        description="Find the issues most similar to an issue"
+    )
+    parser_similar.add_argument("issueid", type=int)
+    parser_similar.add_argument(
+        "-n", "--count",
+        type=int,
+        default=10,
+        help="number of issues to show"
+    )
+    parser_similar.add_argument(
+        "-j", "--jobs",
+        type=int,
+        metavar="N",
+        default=master.config.get("jobs", 4),
+        help="fetch up to N pages concurrently"
+    )
+    parser_similar.set_defaults(func=master.similar)
+
+def add_edit(master, subparsers):
     parser_edit = subparsers.add_parser("edit", description="Edit an issue")
     parser_edit.add_argument("issueid", type=int)
     parser_edit.add_argument("-t", "--title", type=str)
@@ -163,7 +319,7 @@ def add_arguments(master):
     parser_edit.add_argument("-l", "--labels", type=str)
     parser_edit.set_defaults(func=master.edit)
 
-    # OPEN ARGUMENTS
+def add_open(master, subparsers):
     parser_open = subparsers.add_parser(
         "open",
         description="(Re)Open an issue"
@@ -171,7 +327,7 @@ def add_arguments(master):
     parser_open.add_argument("issueid", type=int)
     parser_open.set_defaults(func=master.open)
 
-    # CLOSE ARGUMENTS
+def add_close(master, subparsers):
     parser_close = subparsers.add_parser(
         "close",
         description="Close an issue"
@@ -179,7 +335,7 @@ def add_arguments(master):
     parser_close.add_argument("issueid", type=int)
     parser_close.set_defaults(func=master.close)
 
-    # ASSIGN ARGUMENTS
+def add_assign(master, subparsers):
     parser_assign = subparsers.add_parser(
         "assign",
         description="(Re)Assign an issue"
@@ -202,7 +358,7 @@ def add_arguments(master):
         )
     parser_assign.set_defaults(func=master.assign)
 
-    # CREATE ARGUMENTS
+def add_create(master, subparsers):
     parser_create = subparsers.add_parser(
         "create",
         description="Create an issue"
@@ -211,7 +367,7 @@ def add_arguments(master):
     parser_create.add_argument("body", type=str, nargs="?", default="")
     parser_create.set_defaults(func=master.create)
 
-    # COMMENT ARGUMENTS
+def add_comment(master, subparsers):
     parser_comment = subparsers.add_parser(
         "comment",
         description="Comment on an issue"
@@ -220,7 +376,50 @@ def add_arguments(master):
     parser_comment.add_argument("comment", type=str)
     parser_comment.set_defaults(func=master.comment)
 
-    # MILESTONE ARGUMENTS
+def add_batch(master, subparsers):
+    parser_batch = subparsers.add_parser(
+        "batch",
+        description="Apply many operations at once. Every line of FILE is "
+            "either a command (close 12, edit 13 -l bug) or a JSON object "
+            "({\"op\": \"edit\", \"issue\": 13, \"labels\": [\"bug\"]})"
+    )
+    parser_batch.add_argument(
+        "file",
+        type=argparse.FileType("r"),
+        nargs="?",
+        default="-",
+        help="file with one operation per line (default: stdin)"
+    )
+    parser_batch.add_argument(
+        "-j", "--jobs",
+        type=int,
+        metavar="N",
+        default=master.config.get("jobs", 4),
+        help="run up to N operations concurrently"
+    )
+    parser_batch.set_defaults(func=master.batch)
+
+def add_daemon(master, subparsers):
+    parser_daemon = subparsers.add_parser(
+        "daemon",
+        description="Keep PyGHI running in the background. While it runs, "
+            "pyghi hands commands to it instead of starting from scratch"
+    )
+    parser_daemon.add_argument(
+        "--idle",
+        type=int,
+        metavar="MINUTES",
+        default=0,
+        help="exit after this many minutes without commands (0: never)"
+    )
+    parser_daemon.add_argument(
+        "--stop",
+        action="store_true",
+        help="stop the running daemon"
+    )
+    parser_daemon.set_defaults(func=master.daemon)
+
+def add_milestone(master, subparsers):
     parser_milestone = subparsers.add_parser(
         "milestone",
         description="List milestones for the repo"
@@ -247,11 +446,33 @@ def add_arguments(master):
         const="all"
     )
     
+    add_format(parser_milestone)
     parser_milestone.set_defaults(func=master.milestone)
 
-    # LABEL ARGUMENTS
+def add_label(master, subparsers):
     parser_label = subparsers.add_parser(
         "label",
         description="List labels for the repo"
     )
+    add_format(parser_label)
     parser_label.set_defaults(func=master.label)
+
+# In the order they're listed in the help
+COMMANDS = [
+    ("list", add_list),
+    ("show", add_show),
+    ("sync", add_sync),
+    ("search", add_search),
+    ("similar", add_similar),
+    ("edit", add_edit),
+    ("open", add_open),
+    ("close", add_close),
+    ("assign", add_assign),
+    ("create", add_create),
+    ("comment", add_comment),
+    ("batch", add_batch),
+    ("daemon", add_daemon),
+    ("milestone", add_milestone),
+    ("label", add_label)
+]
+COMMAND_NAMES = [name for name, add in COMMANDS]
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+
+import asyncio
+
+from .mirror import matches
+from .aio import merge
+from .scheduler import RateLimitExceeded
+
+# Results the search API returns at most for one query
+SEARCH_LIMIT = 1000
+
+class RestBackend:
+    """
+    Fetches issues through GitHub's REST API. All methods are coroutines
+    (or async generators) running on the master's event loop.
+    """
+    def __init__(self, master):
+        self.master = master
+
+    def issue_pages(self, params, jobs=4, type=None, bodies=False):
+        """
+        Yields pages of issue payloads matching the issues endpoint's params.
+        Only issues or only PRs (type) are searched for on the server where
+        possible, otherwise the caller has to filter them.
+        """
+        # Search wants milestone titles, we only have numbers
+        if type in ("issues", "prs") and "milestone" not in params:
+            return self.search_pages(params, jobs, type)
+        url = "repos/%s/%s/issues" % (self.master.owner, self.master.repo)
+        return self.master.client.pages(url, params, jobs)
+
+    async def search_pages(self, params, jobs, type):
+        """
+        Yields pages of only issues or only PRs through the search API, so
+        the other type isn't downloaded just to be dropped. Search stops at
+        SEARCH_LIMIT results, beyond that the issues endpoint is used.
+        """
+        client = self.master.client
+        per_page = params.get("per_page", 100)
+        search = {
+            "q": search_query(self.master, params, type),
+            "sort": params.get("sort", "created"),
+            "order": params.get("direction", "desc"),
+            "per_page": per_page
+        }
+
+        before = self.master.bytes
+        pages = client.pages("search/issues", search, jobs)
+        first = await pages.__anext__()
+        if first["total_count"] > SEARCH_LIMIT or first["incomplete_results"]:
+            await pages.aclose()
+            url = "repos/%s/%s/issues" % (self.master.owner, self.master.repo)
+            async for page in client.pages(url, params, jobs):
+                yield page
+            return
+
+        # Search knows no "any assignee", matches sorts that out
+        yield [x for x in first["items"] if matches(x, params)]
+        async for page in pages:
+            yield [x for x in page["items"] if matches(x, params)]
+
+        if self.master.verbose:
+            # Costs one more request, but tells what we didn't download
+            other = "issues" if type == "prs" else "prs"
+            result = await client.get_json("search/issues", {
+                "q": search_query(self.master, params, other),
+                "per_page": 1
+            })
+            fetched, skipped = first["total_count"], result["total_count"]
+            requests = (-(-(fetched + skipped) // per_page) -
+                -(-fetched // per_page))
+            size = (self.master.bytes - before) * skipped / max(1, fetched)
+            self.master.type_filter = (type, skipped, requests, size)
+
+    async def issue(self, number, jobs=4):
+        """
+        Returns the payload of an issue and all its comments. The issue and
+        the first page of comments are fetched at the same time, the other
+        comment pages concurrently once we know how many there are.
+        """
+        url = "repos/%s/%s/issues/%i" % (
+            self.master.owner,
+            self.master.repo,
+            number
+        )
+
+        issue, comments = await asyncio.gather(
+            self.master.client.get_json(url, {}),
+            self.comments(number, jobs)
+        )
+        return issue, comments
+
+    async def comments(self, number, jobs=4):
+        """ Returns all comment payloads of an issue. """
+        url = "repos/%s/%s/issues/%i/comments" % (
+            self.master.owner,
+            self.master.repo,
+            number
+        )
+        return await self.master.client.all_pages(
+            url,
+            {"per_page": 100},
+            jobs
+        )
+
+def search_query(master, params, type):
+    """
+    Returns the search API query for the issues (type) of master's repo
+    matching the issues endpoint's params, except for the milestone.
+    """
+    qualifiers = [
+        "repo:%s/%s" % (master.owner, master.repo),
+        "is:pr" if type == "prs" else "is:issue"
+    ]
+    state = params.get("state", "open")
+    if state != "all":
+        qualifiers.append("is:%s" % (state))
+    if "labels" in params:
+        for label in params["labels"].split(","):
+            qualifiers.append('label:"%s"' % (label.strip()))
+    assignee = params.get("assignee")
+    if assignee == "none":
+        qualifiers.append("no:assignee")
+    elif assignee not in (None, "*"):
+        qualifiers.append("assignee:%s" % (assignee))
+    if "creator" in params:
+        qualifiers.append("author:%s" % (params["creator"]))
+    if "since" in params:
+        qualifiers.append("updated:>=%s" % (params["since"]))
+    return " ".join(qualifiers)
+
+# Fields of issues and PRs needed to render them, in both list and show
+FIELDS = """
+    id number title state url createdAt updatedAt
+    author { login }
+    assignees(first: 1) { nodes { login } }
+    labels(first: 20) { nodes { id name color } }
+    commentCount: comments { totalCount }
+    milestone { id number title state %s }
+    %s
+"""
+
+# Milestone progress is only shown in detail
+PROGRESS = """
+    openIssues: issues(states: OPEN) { totalCount }
+    closedIssues: issues(states: CLOSED) { totalCount }
+"""
+
+LIST_QUERY = """
+query($owner: String!, $repo: String!, $after: String, $labels: [String!],
+        $states: [%sState!], %s) {
+    repository(owner: $owner, name: $repo) {
+        %s(first: 100, after: $after, labels: $labels, states: $states,
+                orderBy: {field: CREATED_AT, direction: DESC}%s) {
+            pageInfo { hasNextPage endCursor }
+            nodes { %s }
+        }
+    }
+}
+"""
+
+SHOW_QUERY = """
+query($owner: String!, $repo: String!, $number: Int!, $after: String) {
+    repository(owner: $owner, name: $repo) {
+        issueOrPullRequest(number: $number) {
+            __typename
+            ... on Issue { %s comments(first: 100, after: $after) { %s } }
+            ... on PullRequest { %s comments(first: 100, after: $after) { %s } }
+        }
+    }
+}
+"""
+
+COMMENT_FIELDS = """
+    pageInfo { hasNextPage endCursor }
+    nodes { id body createdAt updatedAt author { login } }
+"""
+
+class GraphQLBackend:
+    """
+    Fetches issues through GitHub's GraphQL API. Every query only asks for
+    the fields PyGHI renders, and show gets the issue and its comments in
+    one round trip. Results are converted to the REST payload format.
+    """
+    def __init__(self, master):
+        self.master = master
+        self.url = master.config.get("graphql_url", master.api_url + "graphql")
+
+    def query(self, query, variables):
+        """ Runs a GraphQL query and returns its data. """
+        if not "username" in self.master.config:
+            self.master.log(2, "The GraphQL backend requires authentication.")
+
+        try:
+            r = self.master.request("POST", self.url, payload={
+                "query": query,
+                "variables": variables
+            })
+        except RateLimitExceeded as e:
+            self.master.log(2, str(e))
+        except SystemExit:
+            raise
+        except:
+            self.master.log(2, "Couldn't connect to GitHub.")
+        if r.status_code != 200:
+            self.master.log(2, "Couldn't connect to GitHub. Status Code: %i" % (
+                r.status_code
+            ))
+
+        try:
+            result = r.json()
+        except ValueError:
+            self.master.log(2, "Couldn't parse GitHub response.")
+        if result.get("errors"):
+            self.master.log(2, "GitHub GraphQL error: %s" % (
+                result["errors"][0]["message"]
+            ))
+        return result["data"]
+
+    async def nodes(self, connection, params, bodies):
+        """ Yields issues or PRs (connection) matching the REST params. """
+        states = {
+            "issues": {"open": ["OPEN"], "closed": ["CLOSED"]},
+            "pullRequests": {"open": ["OPEN"], "closed": ["CLOSED", "MERGED"]}
+        }[connection].get(params.get("state", "open"))
+
+        variables = {
+            "owner": self.master.owner,
+            "repo": self.master.repo,
+            "states": states,
+            "labels": params["labels"].split(",") if "labels" in params
+                else None
+        }
+
+        # Only issues can be filtered by these on the server
+        filters = ""
+        declarations = ""
+        if connection == "issues":
+            declarations = "$filterBy: IssueFilters"
+            filters = ", filterBy: $filterBy"
+            variables["filterBy"] = {}
+            if "milestone" in params:
+                variables["filterBy"]["milestoneNumber"] = str(
+                    params["milestone"]
+                )
+            if params.get("assignee") not in (None, "none"):
+                variables["filterBy"]["assignee"] = params["assignee"]
+            if "creator" in params:
+                variables["filterBy"]["createdBy"] = params["creator"]
+
+        query = LIST_QUERY % (
+            "Issue" if connection == "issues" else "PullRequest",
+            declarations,
+            connection,
+            filters,
+            FIELDS % ("", "body" if bodies else "")
+        )
+
+        while True:
+            data = await self.master.client.call(self.query, query, variables)
+            result = data["repository"][connection]
+            self.master.pages += 1
+            for node in result["nodes"]:
+                issue = rest_issue(node, connection == "pullRequests")
+                # Label filters are ORed on the server, the rest is missing
+                if matches(issue, params):
+                    yield issue
+            if not result["pageInfo"]["hasNextPage"]:
+                break
+            variables["after"] = result["pageInfo"]["endCursor"]
+
+    async def issue_pages(self, params, jobs=4, type=None, bodies=False):
+        """
+        Yields pages of issue payloads. Issues and PRs are separate
+        connections in GraphQL, both are fetched at once and merged newest
+        first.
+        """
+        streams = []
+        if type != "prs":
+            streams.append(self.nodes("issues", params, bodies))
+        if type != "issues":
+            streams.append(self.nodes("pullRequests", params, bodies))
+
+        merged = merge(streams, key=lambda x: x["created_at"])
+
+        page = []
+        pages = 0
+        async for issue in merged:
+            page.append(issue)
+            if len(page) == params.get("per_page", 100):
+                yield page
+                pages += 1
+                page = []
+        if len(page) > 0 or pages == 0:
+            yield page
+
+    async def issue(self, number, jobs=4):
+        """ Returns the payload of an issue and all its comments. """
+        fields = FIELDS % (PROGRESS, "body")
+        query = SHOW_QUERY % (fields, COMMENT_FIELDS, fields, COMMENT_FIELDS)
+        variables = {
+            "owner": self.master.owner,
+            "repo": self.master.repo,
+            "number": number
+        }
+
+        issue, comments = None, []
+        while True:
+            data = await self.master.client.call(self.query, query, variables)
+            node = data["repository"]["issueOrPullRequest"]
+            if node == None:
+                self.master.log(2, "Issue #%i doesn't exist." % (number))
+            if issue == None:
+                issue = rest_issue(node, node["__typename"] == "PullRequest")
+            comments += map(rest_comment, node["comments"]["nodes"])
+            if not node["comments"]["pageInfo"]["hasNextPage"]:
+                break
+            variables["after"] = node["comments"]["pageInfo"]["endCursor"]
+
+        return issue, comments
+
+    async def comments(self, number, jobs=4):
+        """ Returns all comment payloads of an issue. """
+        return (await self.issue(number, jobs))[1]
+
+def rest_user(actor):
+    """ Converts a GraphQL actor to a REST user payload. """
+    login = actor["login"] if actor != None else "ghost"
+    return {"id": login, "login": login}
+
+def rest_issue(node, is_pr):
+    """ Converts a GraphQL issue or PR node to a REST issue payload. """
+    issue = {
+        "id": node["id"],
+        "number": node["number"],
+        "title": node["title"],
+        "state": "open" if node["state"] == "OPEN" else "closed",
+        "body": node.get("body"),
+        "html_url": node["url"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "user": rest_user(node["author"]),
+        "assignee": None,
+        "labels": node["labels"]["nodes"],
+        "comments": node["commentCount"]["totalCount"],
+        "milestone": None
+    }
+
+    if len(node["assignees"]["nodes"]) > 0:
+        issue["assignee"] = rest_user(node["assignees"]["nodes"][0])
+
+    milestone = node["milestone"]
+    if milestone != None:
+        issue["milestone"] = {
+            "id": milestone["id"],
+            "number": milestone["number"],
+            "title": milestone["title"],
+            "state": milestone["state"].lower()
+        }
+        if "openIssues" in milestone:
+            issue["milestone"]["open_issues"] = \
+                milestone["openIssues"]["totalCount"]
+            issue["milestone"]["closed_issues"] = \
+                milestone["closedIssues"]["totalCount"]
+
+    if is_pr:
+        issue["pull_request"] = {"html_url": node["url"]}
+
+    return issue
+
+def rest_comment(node):
+    """ Converts a GraphQL comment node to a REST comment payload. """
+    return {
+        "id": node["id"],
+        "user": rest_user(node["author"]),
+        "body": node["body"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"]
+    }
+
+BACKENDS = {
+    "rest": RestBackend,
+    "graphql": GraphQLBackend
+}
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import json
+import shlex
+
+# Commands that can be used in a batch
+OPERATIONS = ["edit", "open", "close", "assign", "create", "comment"]
+
+# Keys of JSON operations, the CLI arguments they set and their types
+JSON_KEYS = {
+    "issue": ("issueid", int),
+    "number": ("issueid", int),
+    "title": ("title", str),
+    "body": ("body", str),
+    "assignee": ("assignee", str),
+    "state": ("state", str),
+    "milestone": ("milestone", int),
+    "labels": ("labels", list)
+}
+
+def json_value(key, value):
+    """
+    Returns the CLI argument a key of a JSON operation sets and its value,
+    with numbers given as strings converted. Raises ValueError for unknown
+    keys and values of the wrong type.
+    """
+    if key not in JSON_KEYS:
+        raise ValueError("unknown key: %s" % (key))
+    name, kind = JSON_KEYS[key]
+
+    if kind == int:
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError("%s must be a number" % (key))
+    elif kind == list:
+        if isinstance(value, str):
+            value = [x.strip() for x in value.split(",") if x.strip() != ""]
+        if not isinstance(value, list) or \
+                not all(isinstance(x, str) for x in value):
+            raise ValueError("%s must be a list of names" % (key))
+    elif not isinstance(value, str):
+        raise ValueError("%s must be a string" % (key))
+
+    if key == "state" and value not in ("open", "closed"):
+        raise ValueError("state must be open or closed")
+    return name, value
+
+def api_assignee(assignee):
+    """ Returns an assignee as the API takes it, "none" unassigns. """
+    return assignee if assignee != "none" else ""
+
+def edit_payload(args):
+    """ Builds the PATCH payload for the arguments of an edit command. """
+    labels = args.labels
+    if isinstance(labels, str):
+        labels = [x.strip() for x in labels.split(",") if x.strip() != ""]
+
+    payload = {
+        "title": args.title,
+        "body": args.body,
+        "assignee": api_assignee(args.assignee),
+        "state": args.state,
+        "milestone": args.milestone,
+        "labels": labels
+    }
+    return {k: v for k, v in payload.items() if v != None}
+
+def parse_operation(line, parser):
+    """
+    Parses one line of a batch, either a JSON object with an "op" key or
+    the arguments of a pyghi command. Returns the parsed arguments with the
+    command name in op, or None for blank lines and comments.
+    Raises ValueError for invalid lines.
+    """
+    line = line.strip()
+    if line == "" or line.startswith("#"):
+        return None
+
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            raise ValueError("invalid JSON")
+        if not isinstance(data, dict):
+            raise ValueError("invalid JSON")
+        op = data.pop("op", None)
+        if op not in OPERATIONS:
+            raise ValueError("unknown operation: %s" % (op))
+
+        values, keys = {}, {}
+        for key, value in data.items():
+            name, value = json_value(key, value)
+            if op == "comment" and name == "body":
+                name = "comment"
+            values[name], keys[name] = value, key
+        if op != "create" and "issueid" not in values:
+            raise ValueError("missing issue number")
+
+        # Let the CLI parser fill in the defaults, then apply the JSON
+        positional = {
+            "create": [""],
+            "comment": [str(values.get("issueid")), ""]
+        }.get(op, [str(values.get("issueid"))])
+        args = parse_arguments([op] + positional, parser)
+        for name, value in values.items():
+            if not hasattr(args, name):
+                raise ValueError("%s can't be used with %s" % (keys[name], op))
+            setattr(args, name, value)
+    else:
+        try:
+            words = shlex.split(line)
+        except ValueError as e:
+            raise ValueError("invalid line: %s" % (e))
+        if words[0] not in OPERATIONS:
+            raise ValueError("unknown operation: %s" % (words[0]))
+        args = parse_arguments(words, parser)
+
+        op = words[0]
+
+    args.op = op
+    return args
+
+def parse_arguments(words, parser):
+    """ Runs the CLI parser without letting it exit on errors. """
+    try:
+        return parser.parse_args(words)
+    except SystemExit:
+        raise ValueError("invalid arguments: %s" % (" ".join(words)))
+
+def mutation(args, owner, repo):
+    """
+    Returns method, URL, payload, a description and the affected issue
+    number (None for new issues) of an operation.
+    """
+    issue_url = "repos/%s/%s/issues/%i" % (
+        owner,
+        repo,
+        args.issueid if hasattr(args, "issueid") else 0
+    )
+
+    if args.op == "create":
+        return (
+            "POST",
+            "repos/%s/%s/issues" % (owner, repo),
+            {"title": args.title, "body": args.body},
+            "create \"%s\"" % (args.title),
+            None
+        )
+    if args.op == "comment":
+        return (
+            "POST",
+            issue_url + "/comments",
+            {"body": args.comment},
+            "comment on #%i" % (args.issueid),
+            args.issueid
+        )
+
+    if args.op == "open":
+        payload = {"state": "open"}
+    elif args.op == "close":
+        payload = {"state": "closed"}
+    elif args.op == "assign":
+        payload = {"assignee": api_assignee(args.assignee)}
+    else:
+        payload = edit_payload(args)
+        if len(payload) == 0:
+            raise ValueError("nothing to edit")
+
+    description = "%s #%i" % (args.op, args.issueid)
+    return ("PATCH", issue_url, payload, description, args.issueid)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import hashlib
+import threading
+
+def cache_dir(*parts):
+    """ Returns a path inside PyGHI's cache directory. """
+    base = os.environ.get(
+        "XDG_CACHE_HOME",
+        os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(base, "pyghi", *parts)
+
+class CachedResponse:
+    """ Stands in for a response that was replayed from the cache. """
+    status_code = 200
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.headers = entry["headers"]
+
+    def json(self):
+        return json.loads(self.entry["body"])
+
+    @property
+    def links(self):
+        from requests.utils import parse_header_links
+        links = {}
+        if "Link" in self.headers:
+            for link in parse_header_links(self.headers["Link"]):
+                links[link.get("rel") or link["url"]] = link
+        return links
+
+class ResponseCache:
+    """
+    On-disk cache for GET responses. Entries are revalidated with
+    If-None-Match/If-Modified-Since and evicted least recently used first
+    once the cache grows beyond maxsize bytes.
+    """
+    # Headers that are needed to replay a response
+    KEPT_HEADERS = ["ETag", "Last-Modified", "Link"]
+
+    def __init__(self, path, maxsize):
+        self.path = path
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+
+    def key(self, url, params, user=None):
+        """ Returns the cache key for a request. """
+        params = {k: str(v) for k, v in params.items()}
+        data = json.dumps([url, params, user], sort_keys=True)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    def load(self, key):
+        """ Returns the cached entry for key or None. """
+        path = os.path.join(self.path, key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            os.utime(path, None) # mark as recently used
+        except:
+            return None
+        return entry
+
+    def validators(self, entry):
+        """ Returns the headers for a conditional request for entry. """
+        headers = {}
+        if "ETag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def store(self, key, response):
+        """ Stores a response if it can be revalidated later. """
+        headers = {
+            k: response.headers[k]
+            for k in self.KEPT_HEADERS if k in response.headers
+        }
+        if not "ETag" in headers and not "Last-Modified" in headers:
+            return
+
+        entry = {"headers": headers, "body": response.text}
+        path = os.path.join(self.path, key)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmppath = "%s.%i.tmp" % (path, threading.get_ident())
+            with open(tmppath, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmppath, path)
+        except OSError:
+            return
+
+        self.evict()
+
+    def evict(self):
+        """ Removes least recently used entries until under maxsize. """
+        with self.lock:
+            try:
+                entries = []
+                for name in os.listdir(self.path):
+                    stat = os.stat(os.path.join(self.path, name))
+                    entries.append((stat.st_mtime, stat.st_size, name))
+            except OSError:
+                return
+
+            total = sum(e[1] for e in entries)
+            for mtime, size, name in sorted(entries):
+                if total <= self.maxsize:
+                    break
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+                total -= size
@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
 
+from .model import Model, lazy
 from .user import User
 from .helpers import *
 
-class Comment:
-    def __init__(self, master, data):
-        self.master = master
-        for key in data.keys():
-            setattr(self, key, data[key])
+class Comment(Model):
+    __slots__ = ("_user",)
 
-        self.user = User(self.master, self.user)
+    @lazy
+    def user(self):
+        return self.master.registry.get(User, self.data["user"])
 
     def print_detail(self):
         output = stylize("\n%s wrote %s:" % (
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import socket
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+
+from .cache import cache_dir
+from .helpers import use_client_terminal
+
+# Commands that need the client's stdin or would start another daemon
+LOCAL_COMMANDS = ["daemon", "batch"]
+
+def socket_path():
+    """ Returns the path of the daemon's Unix socket. """
+    return cache_dir("daemon.sock")
+
+def receive(connection):
+    """ Reads a JSON message sent up to EOF. """
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+def send(connection, message):
+    """ Sends a message as one line of JSON. """
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+def replies(connection):
+    """
+    Yields the messages the daemon answers with, up to the final one that
+    holds the exit status.
+    """
+    with connection.makefile("rb") as f:
+        for line in f:
+            message = json.loads(line.decode("utf-8"))
+            yield message
+            if "status" in message:
+                return
+    raise ValueError("The daemon's answer ended early.")
+
+def request(path, message):
+    """ Sends a message to the daemon and returns its final answer. """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+        send(client, message)
+        client.shutdown(socket.SHUT_WR)
+        for reply in replies(client):
+            pass
+        return reply
+    finally:
+        client.close()
+
+def forward(argv):
+    """
+    Runs the command in the daemon, if one is running, and returns its
+    exit status. Returns None otherwise. Output is shown as it arrives and
+    handed to a pager once it no longer fits, like StreamPager does.
+    """
+    if os.environ.get("PYGHI_NO_DAEMON") or set(argv) & set(LOCAL_COMMANDS):
+        return None
+
+    try:
+        size = os.get_terminal_size(sys.stdout.fileno())
+    except OSError:
+        size = (
+            int(os.environ.get("COLUMNS", 80)),
+            int(os.environ.get("LINES", 25))
+        )
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path())
+    except OSError:
+        client.close()
+        return None
+
+    # Records of --format aren't paged
+    formatted = any(x.startswith("--format") for x in argv)
+    paging = sys.stdout.isatty() and not formatted
+    output = sys.stdout
+    buffer = []
+    lines = 0
+    pager = None
+
+    # From here on the command may have run, so don't run it again
+    try:
+        send(client, {"argv": argv, "cwd": os.getcwd(), "size": list(size)})
+        client.shutdown(socket.SHUT_WR)
+        for reply in replies(client):
+            if "stderr" in reply:
+                sys.stderr.write(reply["stderr"])
+                sys.stderr.flush()
+            if "stdout" not in reply:
+                continue
+
+            text = reply["stdout"]
+            if paging and pager == None:
+                buffer.append(text)
+                lines += text.count("\n")
+                if lines <= size[1] - 1:
+                    continue
+                import subprocess
+                pager = subprocess.Popen(
+                    "less -R",
+                    shell=True,
+                    stdin=subprocess.PIPE,
+                    universal_newlines=True
+                )
+                output = pager.stdin
+                text, buffer = "".join(buffer), []
+            try:
+                output.write(text)
+                output.flush()
+            except (BrokenPipeError, ValueError):
+                pass # user quit the pager
+    except (OSError, ValueError):
+        sys.stderr.write("ERROR: Lost the connection to the pyghi daemon.\n")
+        return 1
+    finally:
+        client.close()
+        if pager != None:
+            try:
+                pager.stdin.close()
+            except BrokenPipeError:
+                pass
+            while True:
+                try:
+                    pager.wait()
+                    break
+                except KeyboardInterrupt:
+                    pass # let the pager handle it
+
+    sys.stdout.write("".join(buffer))
+    return reply["status"]
+
+class ClientStream:
+    """
+    A file-like object for stdout or stderr that sends what's written to
+    the client line by line, like a terminal would show it.
+    """
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+        self.buffer = []
+
+    def write(self, text):
+        self.buffer.append(text)
+        if "\n" in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        text, self.buffer = "".join(self.buffer), []
+        # Once the client is gone the rest of the output goes nowhere
+        if text and self.connection.fileno() != -1:
+            try:
+                send(self.connection, {self.name: text})
+            except OSError:
+                self.connection.close()
+                raise
+
+    def isatty(self):
+        return False
+
+def run_command(master, message, connection):
+    """
+    Runs the command of a client's message in its working directory,
+    streaming its output to the client, and returns the exit status.
+    """
+    stdout = ClientStream(connection, "stdout")
+    stderr = ClientStream(connection, "stderr")
+    if set(message["argv"]) & set(LOCAL_COMMANDS):
+        stderr.write("This command can't be run by the daemon.\n")
+        return 2
+
+    status = 0
+    olddir = os.getcwd()
+
+    use_client_terminal(tuple(message["size"]))
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                os.chdir(message["cwd"])
+                master.reset(message["cwd"])
+                master.parse_args(message["argv"])
+            except SystemExit as e:
+                if isinstance(e.code, str):
+                    print(e.code, file=sys.stderr)
+                    status = 1
+                else:
+                    status = e.code or 0
+            except Exception:
+                traceback.print_exc()
+                status = 1
+            master.clear_spinner()
+            stdout.flush()
+            stderr.flush()
+    finally:
+        use_client_terminal(None)
+        os.chdir(olddir)
+    return status
+
+def serve(master, path, idle=None):
+    """
+    Runs the commands clients send to the Unix socket at path, one at a
+    time, until told to stop or idle for idle seconds.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        request(path, {"ping": True})
+        master.log(2, "The daemon is already running.")
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(path):
+        os.remove(path)
+
+    # Only we may connect
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(16)
+    server.settimeout(idle)
+
+    master.interactive = False
+    try:
+        while True:
+            try:
+                connection, address = server.accept()
+            except socket.timeout:
+                break
+            with connection:
+                connection.settimeout(None)
+                try:
+                    message = receive(connection)
+                except (OSError, ValueError):
+                    continue
+                if message.get("stop"):
+                    send(connection, {"status": 0})
+                    break
+                if message.get("ping"):
+                    send(connection, {"status": 0})
+                    continue
+                try:
+                    send(connection, {
+                        "status": run_command(master, message, connection)
+                    })
+                except OSError:
+                    pass # the client went away
+    finally:
+        server.close()
+        os.remove(path)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import math
+
+from .text import tokenize
+
+# Guards the size bounds against floating point noise (0.8 / 1.4 * 7 > 4)
+EPSILON = 1e-9
+PRUNED = float("-inf")
+
+# Words in more issues than this don't bring up candidates. Issues that
+# only share common words are rarely duplicates, and comparing against
+# every issue with such a word is what makes the search quadratic.
+COMMON = 500
+
+def ceil(x):
+    return int(math.ceil(x - EPSILON))
+
+def find_duplicates(issues, stopwords, threshold=0.5):
+    """
+    Finds clusters of issues whose title and body words have a Jaccard
+    similarity of at least threshold.
+
+    Candidates come from an inverted index over prefix tokens (PPJoin):
+    with all token sets sorted rarest word first, two sets can only reach
+    the threshold if their first len - ceil(threshold * len) + 1 words
+    share a word, and candidates whose remaining words can't make up the
+    required overlap are dropped early. Only the survivors are compared,
+    which keeps the search far from quadratic since rare words have short
+    posting lists, and the COMMON words with long ones are left out.
+
+    Returns a list of (score, [issues]) tuples, best clusters first, with
+    score being the highest similarity inside the cluster.
+    """
+    stopwords = set(stopwords)
+    sets = [
+        set(tokenize(
+            # Not issue.body, which stands in a placeholder for no body
+            "%s %s" % (issue.title, issue.data["body"] or ""),
+            stopwords
+        )) for issue in issues
+    ]
+
+    frequency = {}
+    for words in sets:
+        for word in words:
+            frequency[word] = frequency.get(word, 0) + 1
+    docs = [
+        sorted(words, key=lambda x: (frequency[x], x))
+        for words in sets
+    ]
+
+    sizes = [len(words) for words in docs]
+    ratio = threshold / (1 + threshold)
+    pairs = []
+    index = {}
+    # Where each posting list's sets of at least minsize start
+    starts = {}
+    for x in sorted(range(len(docs)), key=lambda x: sizes[x]):
+        words = docs[x]
+        size = sizes[x]
+        if size == 0:
+            continue
+        probe = size - ceil(threshold * size) + 1
+        indexed = size - ceil(2 * ratio * size) + 1
+        minsize = threshold * size - EPSILON
+
+        # Count prefix overlaps, dropping candidates that can't make it
+        overlaps = {}
+        skipped = 0
+        for i, word in enumerate(words[:probe]):
+            rest = size - i - 1
+            if frequency[word] > COMMON:
+                skipped += 1
+                continue
+            postings = index.get(word, ())
+            # Sets come in by size, so minsize only grows and the ones
+            # too small for it are at the front of every list for good
+            start = starts.get(word, 0)
+            while start < len(postings) and \
+                    sizes[postings[start][0]] < minsize:
+                start += 1
+            starts[word] = start
+            for k in range(start, len(postings)):
+                y, j = postings[k]
+                other = sizes[y]
+                overlap = overlaps.get(y, 0)
+                # Skipped words might be shared too
+                bound = 1 + skipped + min(rest, other - j - 1)
+                if overlap + bound >= ratio * (size + other) - EPSILON:
+                    overlaps[y] = overlap + 1
+                else:
+                    overlaps[y] = PRUNED
+
+        for i, word in enumerate(words[:indexed]):
+            if frequency[word] > COMMON:
+                continue
+            index.setdefault(word, []).append((x, i))
+
+        for y, overlap in overlaps.items():
+            if overlap <= 0:
+                continue
+            shared = len(sets[x] & sets[y])
+            score = shared / (sizes[x] + sizes[y] - shared)
+            if score >= threshold - EPSILON:
+                pairs.append((score, x, y))
+
+    # Merge pairs into clusters
+    parent = list(range(len(docs)))
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    for score, i, j in pairs:
+        parent[find(i)] = find(j)
+
+    clusters = {}
+    for score, i, j in pairs:
+        root = find(i)
+        best, members = clusters.get(root, (0, set()))
+        clusters[root] = (max(best, score), members | set([i, j]))
+
+    result = [
+        (score, [issues[x] for x in sorted(members)])
+        for score, members in clusters.values()
+    ]
+    return sorted(result, key=lambda x: -x[0])
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import csv
+import json
+
+def names(items):
+    return ",".join(x["name"] for x in items)
+
+def login(user):
+    return user["login"] if user != None else None
+
+def issue_type(issue):
+    return "pr" if "pull_request" in issue else "issue"
+
+ISSUE_COLUMNS = [
+    ("number", lambda x: x["number"]),
+    ("type", issue_type),
+    ("state", lambda x: x["state"]),
+    ("title", lambda x: x["title"]),
+    ("user", lambda x: login(x["user"])),
+    ("assignee", lambda x: login(x["assignee"])),
+    ("milestone", lambda x: x["milestone"]["number"] if x["milestone"]
+        else None),
+    ("labels", lambda x: names(x["labels"])),
+    ("comments", lambda x: x["comments"]),
+    ("created_at", lambda x: x["created_at"]),
+    ("updated_at", lambda x: x["updated_at"]),
+    ("url", lambda x: x.get("html_url"))
+]
+
+MILESTONE_COLUMNS = [
+    ("number", lambda x: x["number"]),
+    ("state", lambda x: x["state"]),
+    ("title", lambda x: x["title"]),
+    ("description", lambda x: x.get("description")),
+    ("open_issues", lambda x: x.get("open_issues")),
+    ("closed_issues", lambda x: x.get("closed_issues")),
+    ("due_on", lambda x: x.get("due_on")),
+    ("created_at", lambda x: x.get("created_at")),
+    ("updated_at", lambda x: x.get("updated_at")),
+    ("url", lambda x: x.get("html_url"))
+]
+
+LABEL_COLUMNS = [
+    ("name", lambda x: x["name"]),
+    ("color", lambda x: x["color"]),
+    ("description", lambda x: x.get("description"))
+]
+
+def post_columns(number):
+    """
+    Returns the columns of an issue's conversation: the issue itself, then
+    its comments. number is the issue's, comment payloads don't all have it.
+    """
+    return [
+        ("number", lambda x: number),
+        ("type", lambda x: issue_type(x) if "number" in x else "comment"),
+        ("id", lambda x: x["id"]),
+        ("user", lambda x: login(x["user"])),
+        ("created_at", lambda x: x["created_at"]),
+        ("updated_at", lambda x: x["updated_at"]),
+        ("body", lambda x: x["body"])
+    ]
+
+def escape_tsv(value):
+    """ Escapes what would break up a TSV row, like PostgreSQL's COPY. """
+    if value == None:
+        return ""
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r"))
+
+class RecordWriter:
+    """
+    Writes API payloads to stdout as they come in, one per line, without
+    styling or paging. JSON Lines get the whole payload, CSV and TSV rows
+    the given (name, function) columns below a header.
+    """
+    def __init__(self, format, columns):
+        self.format = format
+        self.columns = columns
+        self.stream = sys.stdout
+        if format == "csv":
+            self.csv = csv.writer(self.stream, lineterminator="\n")
+        self.row([name for name, column in columns])
+
+    def row(self, values):
+        try:
+            if self.format == "csv":
+                self.csv.writerow(values)
+            elif self.format == "tsv":
+                self.stream.write("\t".join(map(escape_tsv, values)) + "\n")
+        except BrokenPipeError:
+            self.closed()
+
+    def write(self, record):
+        if self.format == "jsonl":
+            try:
+                self.stream.write(json.dumps(record) + "\n")
+            except BrokenPipeError:
+                self.closed()
+        else:
+            self.row([column(record) for name, column in self.columns])
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+        try:
+            self.stream.flush()
+        except BrokenPipeError:
+            self.closed()
+
+    def closed(self):
+        """ Quits quietly once the reader, e.g. head, has had enough. """
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, self.stream.fileno())
+        sys.exit(0)
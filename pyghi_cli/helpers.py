@@ -4,8 +4,6 @@ import os
 import sys
 import time
 import datetime
-import pydoc
-import shlex
 import struct
 import platform
 import functools
@@ -13,46 +11,153 @@ import functools
 if platform.system() != "Windows":
     import xtermcolor
 
+# Size of the terminal the daemon is rendering for, see use_client_terminal
+_client_terminal = None
+
+def use_client_terminal(size):
+    """
+    Renders output for a client's terminal of the given (cols, rows) size
+    instead of our own, or for our own again if size is None. Paging is
+    left to the client meanwhile.
+    """
+    global _client_terminal
+    _client_terminal = size
+
 def pager(text):
     """ Outputs large text via pager if terminal isn't high enough. """
-    cols, rows = get_terminal_size()
-
-    while text[-1] == "\n":
-        text = text[:-1]
+    stream = StreamPager()
+    stream.write(text)
+    stream.close()
 
+@functools.lru_cache(maxsize=1)
+def find_pymoji():
+    """
+    Returns the optional pymoji module, or None. Failed imports aren't
+    cached by Python, so it's only looked for once.
+    """
     try:
-      import pymoji
-      text = pymoji.replaceAliases(text, 1)
+        import pymoji
+        return pymoji
     except ImportError:
-      pass
+        return None
+
+class StreamPager:
+    """
+    Outputs text as it is produced. Text is held back until it no longer
+    fits on the terminal, at which point it's piped into a pager and every
+    following write goes straight through.
+    """
+    def __init__(self, cmd="less -R"):
+        cols, rows = get_terminal_size()
+        self.rows = rows
+        # The daemon's client does its own paging
+        self.paging = _client_terminal == None
+        self.cmd = cmd
+        self.buffer = []
+        self.lines = 0
+        self.process = None
+        self.pymoji = find_pymoji()
+
+    def write(self, text):
+        """ Queues text for output, starting the pager once it's needed. """
+        if self.pymoji != None:
+            text = self.pymoji.replaceAliases(text, 1)
+
+        if self.process != None:
+            return self._pipe(text)
+
+        if not self.paging:
+            # Straight through to the client, only holding back trailing
+            # newlines as close() ends the output with exactly one
+            text = "".join(self.buffer) + text
+            output = text.rstrip("\n")
+            self.buffer = [text[len(output):]]
+            sys.stdout.write(output)
+            return
 
-    if len(text.split("\n")) > rows - 1:
+        self.buffer.append(text)
+        # Count as we go, rescanning the buffer would be quadratic
+        self.lines += text.count("\n")
+        if self.lines + (not text.endswith("\n")) > self.rows - 1:
+            try:
+                import subprocess
+                self.process = subprocess.Popen(
+                    self.cmd,
+                    shell=True,
+                    stdin=subprocess.PIPE,
+                    universal_newlines=True
+                )
+            except:
+                return
+            text, self.buffer = "".join(self.buffer), []
+            self._pipe(text)
+
+    def _pipe(self, text):
         try:
-            pydoc.pipepager(text, cmd="less -R")
-        except:
-            print(text)
+            self.process.stdin.write(text)
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass # user quit the pager
+
+    def close(self):
+        """ Flushes remaining output and waits for the pager to exit. """
+        if self.process != None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            while True:
+                try:
+                    self.process.wait()
+                    break
+                except KeyboardInterrupt:
+                    pass # let the pager handle it
+        else:
+            print("".join(self.buffer).rstrip("\n"))
+            self.buffer = []
+
+def format_size(size):
+    """ Returns a number of bytes as a human readable string. """
+    for unit in ["B", "kB", "MB"]:
+        if size < 1000:
+            break
+        size /= 1000
     else:
-        print(text)
+        unit = "GB"
+    return ("%i %s" if unit == "B" else "%.1f %s") % (size, unit)
 
 def stylize(text, fg=None, bg=None, bold=False):
     """ Stylizes given text and, if necessary, calculates proper FG colour. """
+    prefix, suffix = style_codes(fg, bg, bold)
+    return prefix + text + suffix
+
+@functools.lru_cache(maxsize=1024)
+def style_codes(fg=None, bg=None, bold=False):
+    """
+    Returns the escape sequences that go before and after text for the
+    given style. Computing them is slow, so they are cached per style.
+    """
+    text = _PLACEHOLDER
     if bold:
         text = "\033[1m" + text + "\033[0m"
 
     # No foreground colour defined, guess one from BG
     if fg == None and bg != None:
-        hexstring = str(hex(bg))[2:].rjust(6, "0")
-        r = int(hexstring[0:2], 16)
-        g = int(hexstring[2:4], 16)
-        b = int(hexstring[4:6], 16)
+        r, g, b = _to_rgb(bg)
         # Credit: http://alienryderflex.com/hsp.html
         brightness = (0.299 * r + 0.587 * g + 0.114 * b) / 255
         fg = 0x000000 if brightness > 0.5 else 0xFFFFFF
 
     if platform.system() == "Windows":
-        return _stylize_windows(text, fg, bg)
+        text = _stylize_windows(text, fg, bg)
     else:
-        return _stylize_unix(text, fg, bg)
+        text = _stylize_unix(text, fg, bg)
+
+    prefix, suffix = text.split(_PLACEHOLDER)
+    return prefix, suffix
+
+# Stands in for the text while the escape sequences are computed
+_PLACEHOLDER = "\0"
 
 def _stylize_windows(text, fg, bg):
     if fg != None:
@@ -71,33 +176,37 @@ def _stylize_unix(text, fg, bg):
         return xtermcolor.colorize(text, rgb=fg)
     return text
 
+_ANSI_BG = {
+    0x000000: "\33[40m",
+    0xFF0000: "\33[41m",
+    0x00FF00: "\33[42m",
+    0xFFFF00: "\33[43m",
+    0x0000FF: "\33[44m",
+    0xFF00FF: "\33[45m",
+    0x00FFFF: "\33[46m",
+    0xFFFFFF: "\33[47m",
+}
+
+_ANSI_FG = {
+    0x000000: "\33[30m",
+    0xFF0000: "\33[31m",
+    0x00FF00: "\33[32m",
+    0xFFFF00: "\33[33m",
+    0x0000FF: "\33[34m",
+    0xFF00FF: "\33[35m",
+    0x00FFFF: "\33[36m",
+    0xFFFFFF: "\33[37m",
+}
+
 # SOURCE:
 # https://mail.python.org/pipermail/python-list/2008-December/482381.html
 def _rgb_to_ansi(rgb, bg=False):
     """ For shitty Windows systems we have to manually convert things. """
     if bg:
-        ansi_colours = {
-            0x000000: "\33[40m",
-            0xFF0000: "\33[41m",
-            0x00FF00: "\33[42m",
-            0xFFFF00: "\33[43m",
-            0x0000FF: "\33[44m",
-            0xFF00FF: "\33[45m",
-            0x00FFFF: "\33[46m",
-            0xFFFFFF: "\33[47m",
-        }
+        ansi_colours = _ANSI_BG
         reset = "\33[49m"
     else:
-        ansi_colours = {
-            0x000000: "\33[30m",
-            0xFF0000: "\33[31m",
-            0x00FF00: "\33[32m",
-            0xFFFF00: "\33[33m",
-            0x0000FF: "\33[34m",
-            0xFF00FF: "\33[35m",
-            0x00FFFF: "\33[36m",
-            0xFFFFFF: "\33[37m",
-        }
+        ansi_colours = _ANSI_FG
         reset = "\33[39m"
 
     closest_match = min(ansi_colours, key=functools.partial(_euclidian, rgb))
@@ -174,6 +283,9 @@ def get_terminal_size():
      originally retrieved from:
      http://stackoverflow.com/questions/566746/how-to-get-console-window-width-in-python
     """
+    if _client_terminal != None:
+        return _client_terminal
+
     current_os = platform.system()
     tuple_xy = None
     if current_os == 'Windows':
@@ -206,6 +318,8 @@ def _get_terminal_size_tput():
     # get terminal width
     # src: http://stackoverflow.com/questions/263890/how-do-i-find-the-width-height-of-a-terminal-window
     try:
+        import shlex
+        import subprocess
         cols = int(subprocess.check_call(shlex.split('tput cols')))
         rows = int(subprocess.check_call(shlex.split('tput lines')))
         return (cols, rows)
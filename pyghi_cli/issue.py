@@ -2,50 +2,90 @@
 
 import sys
 
+from .model import Model, lazy
 from .label import Label
 from .milestone import Milestone
 from .user import User
 from .comment import Comment
 from .helpers import padding, stylize, relative_time
 
-class Issue:
-    def __init__(self, master, data, comments=[]):
-        self.master = master
-        for key in data.keys():
-            setattr(self, key, data[key])
-
-        if self.body == None:
-            self.body = ""
-        if self.body == "":
-            self.body = "No description provided."
-
-        self.user = User(self.master, self.user)
-        if self.assignee != None:
-            self.assignee = User(self.master, self.assignee)
-
-        self.is_pr = "pull_request" in data
-
-        if self.milestone != None:
-            self.milestone = Milestone(self.master, self.milestone)
-        self.comments = list(map(lambda x: Comment(self.master, x), comments))
-        self.labels = list(map(lambda x: Label(self.master, x), self.labels))
+class Issue(Model):
+    __slots__ = (
+        "comment_data",
+        "_user",
+        "_assignee",
+        "_milestone",
+        "_labels",
+        "_comments"
+    )
+
+    def __init__(self, master, data, comments=None):
+        """
+        comments are the comment payloads if they have been fetched. If not,
+        only the comment count from the issue payload is available.
+        """
+        Model.__init__(self, master, data)
+        self.comment_data = comments
+
+    @property
+    def body(self):
+        return self.data["body"] or "No description provided."
+
+    @property
+    def is_pr(self):
+        return "pull_request" in self.data
+
+    @lazy
+    def user(self):
+        return self.master.registry.get(User, self.data["user"])
+
+    @lazy
+    def assignee(self):
+        if self.data["assignee"] == None:
+            return None
+        return self.master.registry.get(User, self.data["assignee"])
+
+    @lazy
+    def milestone(self):
+        if self.data["milestone"] == None:
+            return None
+        return self.master.registry.get(Milestone, self.data["milestone"])
+
+    @lazy
+    def labels(self):
+        registry = self.master.registry
+        return list(map(lambda x: registry.get(Label, x), self.data["labels"]))
+
+    @lazy
+    def comments(self):
+        return list(map(
+            lambda x: Comment(self.master, x),
+            self.comment_data or []
+        ))
+
+    @property
+    def comment_count(self):
+        if self.comment_data != None:
+            return len(self.comment_data)
+        return self.data["comments"]
 
     def print_line(self, shortlabels=False, nolabels=False, nocomments=False):
-        number = stylize(("#" + str(self.number)).rjust(6), bold=True) + " "
+        data = self.data
+        number = stylize(("#" + str(data["number"])).rjust(6), bold=True) + " "
 
-        if self.state == "open":
+        if data["state"] == "open":
             state = stylize(" O ", bg=0x00AA00) + " "
         else:
             state = stylize(" C ", bg=0xDD0000) + " "
 
         issuetype = stylize(" P ", bg=0xCC00CC) + " " if self.is_pr else ""
         
-        name = self.title + " "
+        name = data["title"] + " "
         
         labels = ""
         if shortlabels:
             labels = " ".join(list(map(
-                lambda x: stylize(" ", bg=int(x.color, 16)),
+                lambda x: x.print_short(),
                 self.labels
             ))) + " "
         elif not nolabels:
@@ -57,7 +97,7 @@ class Issue:
         comments = ""
         if not nocomments:
             comments = "[%i %s]" % (
-                len(self.comments),
+                self.comment_count,
                 stylize("@", fg=0xFFFF00)
             )
 
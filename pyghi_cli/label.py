@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 
-from .helpers import stylize
+from .model import Model, UNSET
+from .helpers import stylize, style_codes
 
-class Label:
+class Label(Model):
     """ A class holding various methods for formatting GH Label information. """
+    __slots__ = ("prefix", "suffix", "_name")
+
     def __init__(self, master, data):
-        self.master = master
-        for key in data.keys():
-            setattr(self, key, data[key])
+        Model.__init__(self, master, data)
+
+        # Every label is printed many times in a listing
+        self.prefix, self.suffix = style_codes(bg=int(data["color"], 16))
 
     def print_line(self):
         """ Prints a line summary of the label. """
@@ -21,4 +25,14 @@ class Label:
 
     def print_name(self):
         """ Prints the coloured name of the label. """
-        return stylize(" %s " % (self.name), bg=int(self.color, 16))
+        if self._name is UNSET:
+            self._name = "%s %s %s" % (
+                self.prefix,
+                self.data["name"],
+                self.suffix
+            )
+        return self._name
+
+    def print_short(self):
+        """ Prints a coloured block for the label. """
+        return self.prefix + " " + self.suffix
@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 
+from .model import Model
 from .helpers import stylize
 
-class Milestone:
+class Milestone(Model):
     """ Class holding various methods to format GH milestone information. """
-    def __init__(self, master, data):
-        self.master = master
-        for key in data.keys():
-            setattr(self, key, data[key])
+    __slots__ = ()
 
     def progress_bar(self):
         """ Returns a string containing a progress bar for the milestone. """
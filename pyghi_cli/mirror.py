@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import sqlite3
+
+class Mirror:
+    """
+    A local SQLite copy of a repository's issues and comments, kept up to
+    date incrementally with the API's since parameter.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS issues (
+                number INTEGER PRIMARY KEY,
+                state TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                data TEXT
+            );
+            CREATE TABLE IF NOT EXISTS comments (
+                id INTEGER PRIMARY KEY,
+                issue INTEGER,
+                created_at TEXT,
+                updated_at TEXT,
+                data TEXT
+            );
+            CREATE INDEX IF NOT EXISTS comments_issue ON comments (issue);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def get_meta(self, key):
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row != None else None
+
+    def set_meta(self, key, value):
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, value)
+        )
+        self.db.commit()
+
+    def is_synced(self):
+        """ Returns whether the mirror has been synced at least once. """
+        return self.get_meta("synced_at") != None
+
+    def fingerprint(self):
+        """ Returns a string that changes whenever the stored issues do. """
+        row = self.db.execute(
+            "SELECT COUNT(*), MAX(updated_at) FROM issues"
+        ).fetchone()
+        return "%i:%s" % row
+
+    def store_issues(self, issues):
+        """ Inserts or updates the given issue payloads. """
+        self.db.executemany(
+            "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?)",
+            [(
+                x["number"],
+                x["state"],
+                x["created_at"],
+                x["updated_at"],
+                json.dumps(x)
+            ) for x in issues]
+        )
+        self.db.commit()
+
+    def store_comments(self, comments):
+        """ Inserts or updates the given comment payloads. """
+        self.db.executemany(
+            "INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?)",
+            [(
+                x["id"],
+                int(x["issue_url"].rsplit("/", 1)[1]),
+                x["created_at"],
+                x["updated_at"],
+                json.dumps(x)
+            ) for x in comments]
+        )
+        self.db.commit()
+
+    def issue(self, number):
+        """ Returns the payload of an issue or None. """
+        row = self.db.execute(
+            "SELECT data FROM issues WHERE number = ?", (number,)
+        ).fetchone()
+        return json.loads(row[0]) if row != None else None
+
+    def comments(self, number):
+        """ Returns the comment payloads of an issue, oldest first. """
+        rows = self.db.execute(
+            "SELECT data FROM comments WHERE issue = ? "
+            "ORDER BY created_at, id", (number,)
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def issues(self, params):
+        """
+        Returns the issue payloads matching the filters of the issues
+        endpoint (state, milestone, labels, assignee, creator), newest first.
+        """
+        query = "SELECT data FROM issues"
+        state = params.get("state", "open")
+        if state != "all":
+            query += " WHERE state = ?"
+            rows = self.db.execute(query + " ORDER BY created_at DESC, "
+                "number DESC", (state,))
+        else:
+            rows = self.db.execute(query + " ORDER BY created_at DESC, "
+                "number DESC")
+
+        issues = map(lambda row: json.loads(row[0]), rows)
+        return [x for x in issues if matches(x, params)]
+
+def matches(issue, params):
+    """ Checks an issue payload against the issues endpoint's filters. """
+    if params.get("milestone") != None:
+        milestone = issue["milestone"]
+        if milestone == None or milestone["number"] != params["milestone"]:
+            return False
+
+    if params.get("labels") != None:
+        names = [x["name"] for x in issue["labels"]]
+        for label in params["labels"].split(","):
+            if label.strip() not in names:
+                return False
+
+    assignee = params.get("assignee")
+    if assignee == "none":
+        if issue["assignee"] != None:
+            return False
+    elif assignee == "*":
+        if issue["assignee"] == None:
+            return False
+    elif assignee != None:
+        if issue["assignee"] == None or issue["assignee"]["login"] != assignee:
+            return False
+
+    if params.get("creator") != None:
+        if issue["user"]["login"] != params["creator"]:
+            return False
+
+    return True
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+# Value of lazy slots that haven't been built yet
+UNSET = object()
+
+class Model:
+    """
+    Base class for the objects wrapping GitHub API payloads. Fields are
+    read from the payload when accessed instead of being copied onto every
+    instance, and subclasses use __slots__ to stay small.
+    """
+    __slots__ = ("master", "data")
+
+    def __init__(self, master, data):
+        self.master = master
+        self.data = data
+        for slot in self.__slots__:
+            setattr(self, slot, UNSET)
+
+    def __getattr__(self, key):
+        # Only called for names that aren't slots, properties or methods
+        if key == "data":
+            raise AttributeError(key)
+        try:
+            return self.data[key]
+        except KeyError:
+            raise AttributeError(key)
+
+class lazy:
+    """
+    Decorator for a property that is built on first access and then kept
+    in the slot of the same name prefixed with an underscore. The slot has
+    to be listed in the class's __slots__.
+    """
+    def __init__(self, build):
+        self.build = build
+        self.slot = "_" + build.__name__
+        self.__doc__ = build.__doc__
+
+    def __get__(self, instance, owner):
+        if instance == None:
+            return self
+        value = getattr(instance, self.slot)
+        if value is UNSET:
+            value = self.build(instance)
+            setattr(instance, self.slot, value)
+        return value
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+
+import re
+import time
+import operator
+
+# A field, an operator and a value, which may be quoted
+TERM = re.compile(r'(-?)([a-z]+)(:|<=|>=|<|>|=)("[^"]*"|[^\s()"]+)')
+WORD = re.compile(r"[^\s()]+")
+
+DURATION = re.compile(r"^(\d+)([hdwmy])$")
+DATE = re.compile(r"^\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}:\d{2}Z)?$")
+UNITS = {"h": 3600, "d": 86400, "w": 604800, "m": 2592000, "y": 31536000}
+
+NUMBER_FIELDS = ["comments", "number"]
+DATE_FIELDS = ["created", "updated"]
+TEXT_FIELDS = ["label", "state", "is", "assignee", "author", "milestone",
+    "title"]
+ALIASES = {"labels": "label", "creator": "author", "user": "author"}
+
+# Sort keys, and the ones the issues endpoint can sort by itself
+SORT_KEYS = ["created", "updated", "comments", "number", "title"]
+SERVER_SORT_KEYS = ["created", "updated", "comments"]
+
+OPERATORS = {
+    ":": operator.eq,
+    "=": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge
+}
+
+# How an operator reads when the value is an age instead of a date
+AGE_OPERATORS = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+def tokenize(text):
+    """ Splits an expression into parentheses, keywords and terms. """
+    tokens = []
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char.isspace():
+            position += 1
+        elif char in "()":
+            tokens.append(char)
+            position += 1
+        else:
+            match = TERM.match(text, position)
+            if match == None:
+                match = WORD.match(text, position)
+                word = match.group(0)
+                if word.upper() not in ("AND", "OR", "NOT"):
+                    raise ValueError("Unknown term '%s'." % (word))
+                tokens.append(word.upper())
+            else:
+                negate, field, op, value = match.groups()
+                field = ALIASES.get(field, field)
+                value = value.strip('"')
+                term = ("term", field, op, value)
+                tokens.append(("not", term) if negate else term)
+            position = match.end()
+    return tokens
+
+def parse(text):
+    """
+    Parses a filter expression into a tree of ("or", [...]), ("and", [...]),
+    ("not", node) and ("term", field, op, value) tuples. AND binds tighter
+    than OR and may be left out between terms. Raises ValueError.
+    """
+    tokens = tokenize(text)
+    if len(tokens) == 0:
+        raise ValueError("The expression is empty.")
+
+    def peek():
+        return tokens[0] if len(tokens) > 0 else None
+
+    def parse_or():
+        nodes = [parse_and()]
+        while peek() == "OR":
+            tokens.pop(0)
+            nodes.append(parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and():
+        nodes = [parse_not()]
+        while peek() not in (None, "OR", ")"):
+            if peek() == "AND":
+                tokens.pop(0)
+            nodes.append(parse_not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_not():
+        token = tokens.pop(0) if len(tokens) > 0 else None
+        if token == "NOT":
+            return ("not", parse_not())
+        if token == "(":
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError("Missing ')'.")
+            tokens.pop(0)
+            return node
+        if isinstance(token, tuple):
+            check(token)
+            return token
+        raise ValueError("Unexpected %s." % (
+            "end of expression" if token == None else "'%s'" % (token)
+        ))
+
+    tree = parse_or()
+    if len(tokens) > 0:
+        raise ValueError("Unexpected '%s'." % (tokens[0]))
+    return tree
+
+def check(node):
+    """ Raises ValueError if a term's field, operator or value is invalid. """
+    if node[0] == "not":
+        return check(node[1])
+    kind, field, op, value = node
+    if field in NUMBER_FIELDS:
+        if not value.isdigit():
+            raise ValueError("'%s' needs a number." % (field))
+    elif field in DATE_FIELDS:
+        if not DURATION.match(value) and not DATE.match(value):
+            raise ValueError("'%s' needs a date (2020-01-31) or an age "
+                "(7d)." % (field))
+    elif field in TEXT_FIELDS:
+        if op != ":":
+            raise ValueError("'%s' can only be matched with ':'." % (field))
+    else:
+        raise ValueError("Unknown field '%s'." % (field))
+
+    if field == "state" and value not in ("open", "closed"):
+        raise ValueError("'state' is either open or closed.")
+    if field == "is" and value not in ("open", "closed", "pr", "issue"):
+        raise ValueError("'is' is one of open, closed, pr or issue.")
+    if field == "milestone" and not (value.isdigit() or value == "none"):
+        raise ValueError("'milestone' needs a number or none.")
+
+def date_condition(op, value, now):
+    """
+    Returns the operator and ISO timestamp to compare a date field with, or
+    None for a date meant as a whole day (created:2020-01-31). Ages count
+    back from now, so they flip the comparison.
+    """
+    match = DURATION.match(value)
+    if match:
+        seconds = int(match.group(1)) * UNITS[match.group(2)]
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - seconds))
+        if op in (":", "="):
+            return ">=", stamp # within that age
+        return AGE_OPERATORS[op], stamp
+    if op in (":", "="):
+        return None
+    if len(value) == 10 and op in (">", "<="):
+        value += "T23:59:59Z"
+    elif len(value) == 10:
+        value += "T00:00:00Z"
+    return op, value
+
+def compile_term(field, op, value, now):
+    """ Returns a function checking an issue payload against a term. """
+    if field in NUMBER_FIELDS:
+        value = int(value)
+        compare = OPERATORS[op]
+        return lambda x: compare(x[field], value)
+
+    if field in DATE_FIELDS:
+        key = field + "_at"
+        condition = date_condition(op, value, now)
+        if condition == None:
+            return lambda x: x[key].startswith(value)
+        op, stamp = condition
+        compare = OPERATORS[op]
+        return lambda x: compare(x[key], stamp)
+
+    value = value.lower()
+    if field == "label":
+        return lambda x: any(l["name"].lower() == value for l in x["labels"])
+    if field == "state":
+        return lambda x: x["state"] == value
+    if field == "is":
+        if value in ("pr", "issue"):
+            is_pr = value == "pr"
+            return lambda x: ("pull_request" in x) == is_pr
+        return lambda x: x["state"] == value
+    if field in ("assignee", "author"):
+        key = "assignee" if field == "assignee" else "user"
+        if value == "none":
+            return lambda x: x[key] == None
+        if value == "*":
+            return lambda x: x[key] != None
+        return lambda x: x[key] != None and x[key]["login"].lower() == value
+    if field == "milestone":
+        if value == "none":
+            return lambda x: x["milestone"] == None
+        number = int(value)
+        return lambda x: (x["milestone"] != None and
+            x["milestone"]["number"] == number)
+    if field == "title":
+        return lambda x: value in x["title"].lower()
+
+def compile_tree(tree, now=None):
+    """
+    Compiles a tree from parse into a single function taking an issue
+    payload, so the tree is only walked once and not for every issue.
+    """
+    if now == None:
+        now = time.time()
+    kind = tree[0]
+    if kind == "term":
+        return compile_term(tree[1], tree[2], tree[3], now)
+    if kind == "not":
+        child = compile_tree(tree[1], now)
+        return lambda x: not child(x)
+    children = [compile_tree(x, now) for x in tree[1]]
+    if kind == "and":
+        return lambda x: all(f(x) for f in children)
+    return lambda x: any(f(x) for f in children)
+
+def constrains_state(tree):
+    """ Returns whether a tree refers to the state of issues anywhere. """
+    if tree[0] == "term":
+        return tree[1] == "state" or (tree[1] == "is" and
+            tree[3] in ("open", "closed"))
+    if tree[0] == "not":
+        return constrains_state(tree[1])
+    return any(map(constrains_state, tree[1]))
+
+def pushdown(tree, params, now=None):
+    """
+    Adds the issues endpoint's params that narrow down the results without
+    losing any that match the tree, i.e. those of terms every match has to
+    satisfy. The tree still has to be checked locally.
+    """
+    if now == None:
+        now = time.time()
+    terms = tree[1] if tree[0] == "and" else [tree]
+    labels = []
+    for term in terms:
+        if term[0] != "term":
+            continue
+        kind, field, op, value = term
+        if field == "label":
+            labels.append(value)
+        elif field in ("state", "is") and value in ("open", "closed"):
+            if params.get("state", "all") == "all":
+                params["state"] = value
+        elif field == "assignee" and "assignee" not in params:
+            params["assignee"] = value
+        elif field == "author" and "creator" not in params:
+            params["creator"] = value
+        elif field == "milestone" and "milestone" not in params:
+            if value.isdigit():
+                params["milestone"] = int(value)
+        elif field == "updated":
+            # since only cuts off issues updated before it
+            condition = date_condition(op, value, now)
+            if condition != None and condition[0] in (">", ">="):
+                if condition[1] > params.get("since", ""):
+                    params["since"] = condition[1]
+
+    # The issues endpoint ANDs labels
+    if len(labels) > 0:
+        if "labels" in params:
+            labels.insert(0, params["labels"])
+        params["labels"] = ",".join(labels)
+    return params
+
+def parse_sort(text):
+    """
+    Parses a comma-separated list of sort keys, each optionally suffixed
+    with -asc or -desc (the default), into (key, descending) pairs.
+    Raises ValueError.
+    """
+    keys = []
+    for item in text.split(","):
+        key, _, direction = item.strip().partition("-")
+        if key not in SORT_KEYS:
+            raise ValueError("Can't sort by '%s'. Use one of %s." % (
+                key,
+                ", ".join(SORT_KEYS)
+            ))
+        if direction not in ("", "asc", "desc"):
+            raise ValueError("Sort direction is either asc or desc.")
+        keys.append((key, direction != "asc"))
+    return keys
+
+def sort_params(keys):
+    """ Returns the issues endpoint's params for keys, or None. """
+    if len(keys) != 1 or keys[0][0] not in SERVER_SORT_KEYS:
+        return None
+    key, descending = keys[0]
+    return {"sort": key, "direction": "desc" if descending else "asc"}
+
+def sort(issues, keys):
+    """ Sorts issue payloads in place by (key, descending) pairs. """
+    columns = {
+        "created": lambda x: x["created_at"],
+        "updated": lambda x: x["updated_at"],
+        "comments": lambda x: x["comments"],
+        "number": lambda x: x["number"],
+        "title": lambda x: x["title"].lower()
+    }
+    # Sorting is stable, so the least significant key goes first
+    for key, descending in reversed(keys):
+        issues.sort(key=columns[key], reverse=descending)
+    return issues
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+class Registry:
+    """
+    Identity map for users, labels and milestones. Issues of a listing
+    share these, so every distinct one is built and styled once per run.
+    """
+    def __init__(self, master):
+        self.master = master
+        self.objects = {}
+        self.created = {}
+        self.reused = {}
+
+    def get(self, cls, data):
+        """ Returns the cls object for the given payload, building it once. """
+        key = (cls, data.get("id", data.get("url")))
+        obj = self.objects.get(key)
+        name = cls.__name__
+        if obj == None:
+            obj = cls(self.master, data)
+            self.objects[key] = obj
+            self.created[name] = self.created.get(name, 0) + 1
+        else:
+            self.reused[name] = self.reused.get(name, 0) + 1
+        return obj
+
+    def stats(self):
+        """ Returns a summary of how many objects were built and reused. """
+        names = sorted(set(self.created) | set(self.reused))
+        return ", ".join(
+            "%s: %i built, %i reused" % (
+                name.lower() + "s",
+                self.created.get(name, 0),
+                self.reused.get(name, 0)
+            ) for name in names
+        ) or "no objects built"
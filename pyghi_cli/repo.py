@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import json
+
+# Remotes tried when neither the config nor the current branch names one
+PREFERRED_REMOTES = ["origin", "upstream"]
+
+# Number of working directories remembered in the cache
+CACHE_ENTRIES = 200
+
+GITHUB_URL = re.compile(
+    r"github\.com[/:]+([a-zA-Z0-9-_]+)/([a-zA-Z0-9-_.]+?)(?:\.git)?/?$"
+)
+
+def find_git_dir(path):
+    """
+    Returns the git dir of the repository containing path, or None. A .git
+    file, as used by worktrees and submodules, is followed to its gitdir.
+    """
+    path = os.path.abspath(path)
+    while True:
+        dotgit = os.path.join(path, ".git")
+        if os.path.isdir(dotgit):
+            return dotgit
+        if os.path.isfile(dotgit):
+            with open(dotgit, "r") as f:
+                line = f.readline().strip()
+            if line.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(path, line[7:].strip()))
+            return None
+        if path == os.path.dirname(path):
+            return None
+        path = os.path.dirname(path)
+
+def common_dir(gitdir):
+    """
+    Returns the directory holding the config of a git dir. Worktrees only
+    have their own HEAD, everything else lives in the main git dir.
+    """
+    try:
+        with open(os.path.join(gitdir, "commondir"), "r") as f:
+            return os.path.normpath(os.path.join(gitdir, f.read().strip()))
+    except OSError:
+        return gitdir
+
+def parse_config(text):
+    """ Returns a dict mapping (section, subsection) to a dict of values. """
+    sections = {}
+    values = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line == "" or line[0] in "#;":
+            continue
+        match = re.match(r'^\[\s*([\w.-]+)(?:\s+"(.*)")?\s*\]$', line)
+        if match:
+            key = (match.group(1).lower(), match.group(2))
+            values = sections.setdefault(key, {})
+        elif values != None and "=" in line:
+            name, value = line.split("=", 1)
+            values.setdefault(name.strip().lower(), value.strip())
+    return sections
+
+def current_branch(gitdir):
+    """ Returns the name of the checked out branch, or None. """
+    try:
+        with open(os.path.join(gitdir, "HEAD"), "r") as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+    if head.startswith("ref: refs/heads/"):
+        return head[16:]
+    return None
+
+def github_repo(gitdir, remote=None):
+    """
+    Returns the (owner, repo) of a git dir's GitHub remote. The remote is
+    the given one, the current branch's upstream remote, origin, upstream
+    or the first one pointing at GitHub, in that order.
+    Raises ValueError if there is none.
+    """
+    with open(os.path.join(common_dir(gitdir), "config"), "r") as f:
+        config = parse_config(f.read())
+
+    urls = {}
+    for (section, name), values in config.items():
+        if section == "remote" and "url" in values:
+            match = GITHUB_URL.search(values["url"])
+            if match:
+                urls[name] = (match.group(1), match.group(2))
+
+    if remote != None:
+        if remote not in urls:
+            raise ValueError("Remote '%s' isn't a GitHub repo." % (remote))
+        return urls[remote]
+
+    branch = config.get(("branch", current_branch(gitdir)), {})
+    for name in [branch.get("remote")] + PREFERRED_REMOTES + sorted(urls):
+        if name in urls:
+            return urls[name]
+    raise ValueError("Couldn't extract GitHub URL.")
+
+class RepoCache:
+    """
+    Remembers which GitHub repo a working directory belongs to. Entries are
+    only trusted while the git config and HEAD haven't been modified, so
+    repeated calls skip walking the filesystem and parsing the config.
+    """
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def stamp(self, gitdir):
+        """ Returns the modification times the entry for gitdir depends on. """
+        stamp = []
+        for path in [os.path.join(common_dir(gitdir), "config"),
+                os.path.join(gitdir, "HEAD")]:
+            try:
+                stamp.append(os.stat(path).st_mtime)
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def get(self, cwd, remote):
+        entry = self.entries.get(cwd)
+        if entry == None or entry["remote"] != remote:
+            return None
+        if self.stamp(entry["gitdir"]) != entry["stamp"]:
+            return None
+        return entry["owner"], entry["repo"]
+
+    def put(self, cwd, remote, gitdir, owner, repo):
+        self.entries.pop(cwd, None)
+        self.entries[cwd] = {
+            "remote": remote,
+            "gitdir": gitdir,
+            "stamp": self.stamp(gitdir),
+            "owner": owner,
+            "repo": repo
+        }
+        # Forget the directories that were looked up first
+        for key in list(self.entries)[:-CACHE_ENTRIES]:
+            del self.entries[key]
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = "%s.%i.tmp" % (self.path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+def resolve(cwd, remote=None, cache=None):
+    """
+    Returns the (owner, repo) of the GitHub repository cwd belongs to,
+    looked up in the RepoCache if given. Raises ValueError on failure.
+    """
+    cwd = os.path.abspath(cwd)
+    if cache != None:
+        result = cache.get(cwd, remote)
+        if result != None:
+            return result
+
+    gitdir = find_git_dir(cwd)
+    if gitdir == None:
+        raise ValueError("Current directory is no git repo.")
+    try:
+        owner, repo = github_repo(gitdir, remote)
+    except OSError:
+        raise ValueError("Couldn't read the git config.")
+
+    if cache != None:
+        try:
+            cache.put(cwd, remote, gitdir, owner, repo)
+        except OSError:
+            pass
+    return owner, repo
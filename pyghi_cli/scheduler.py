@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+
+# Status codes worth retrying after a short wait
+TRANSIENT = [500, 502, 503, 504]
+
+# Spreading a low quota never slows down below this many requests per
+# second, a handful of remaining requests shouldn't mean hours of sleep
+MIN_RATE = 0.5
+
+# Share of a resource's limit below which its quota is spread
+LOW_QUOTA = 0.1
+
+class RateLimitExceeded(Exception):
+    """ Raised instead of waiting longer than max_wait for the quota. """
+    def __init__(self, reset):
+        self.reset = reset
+        super().__init__("GitHub rate limit exceeded, it resets at %s." % (
+            time.strftime("%H:%M", time.localtime(int(reset)))
+        ))
+
+class Scheduler:
+    """
+    Paces all requests of a run. Requests go out as fast as the workers
+    send them while the quota lasts, unless a rate is configured. Once the
+    remaining quota of a resource gets low, a token bucket spreads it until
+    it resets, and an exhausted one holds back every worker until then.
+    Rate limited or transiently failed requests pause every worker, not
+    just the one that noticed.
+    """
+    def __init__(self, config):
+        self.rate = None
+        if config.get("rate") != None:
+            self.rate = float(config["rate"])
+        self.burst = float(config.get("burst", config.get("pool_size", 10)))
+        self.retries = int(config.get("retries", 3))
+        self.backoff = float(config.get("backoff", 0.5))
+        self.max_wait = float(config.get("max_wait", 60))
+
+        self.lock = threading.Lock()
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.waiting_until = 0
+        self.limits = {}
+        self.waited = 0.0
+
+    def acquire(self):
+        """
+        Blocks until the caller may send a request. Raises RateLimitExceeded
+        if that would take longer than max_wait.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                rate, reset = self.current_rate()
+                # Only a configured rate allows bursts, a spread quota doesn't
+                capacity = self.burst if reset == None else 1
+                self.tokens = min(
+                    capacity,
+                    self.tokens + (now - self.updated) * (rate or 0)
+                )
+                self.updated = now
+
+                wait = self.paused_until - now
+                if wait <= 0 and rate == 0:
+                    # Nothing left, the tokens in the bucket don't count
+                    wait = reset - time.time()
+                elif wait <= 0:
+                    if rate == None:
+                        return
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / rate
+                if wait > self.max_wait:
+                    raise RateLimitExceeded(
+                        reset if reset != None else time.time() + wait
+                    )
+
+                # Workers wait side by side, count the time only once
+                end = now + wait
+                self.waited += max(0, end - max(now, self.waiting_until))
+                self.waiting_until = max(self.waiting_until, end)
+            time.sleep(wait)
+
+    def current_rate(self):
+        """
+        Returns the rate to send at, None for no pacing, and when the quota
+        holding it back resets, if any. That's the configured rate, unless a
+        quota is below LOW_QUOTA. Then its remaining requests are spread
+        evenly until it resets, down to MIN_RATE, or none are left at all.
+        """
+        rate, limiting = self.rate, None
+        now = time.time()
+        for limit, remaining, reset in self.limits.values():
+            if reset <= now or remaining >= max(self.burst, limit * LOW_QUOTA):
+                continue
+            if remaining == 0:
+                stretched = 0
+            else:
+                stretched = max(remaining / (reset - now), MIN_RATE)
+            if rate == None or stretched < rate or \
+                    (stretched == 0 and reset > limiting):
+                rate, limiting = stretched, reset
+        return rate, limiting
+
+    def update(self, response):
+        """ Records the rate-limit headers of a response. """
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        resource = headers.get("X-RateLimit-Resource", "core")
+        try:
+            limit = (
+                int(headers.get("X-RateLimit-Limit", 0)),
+                int(headers["X-RateLimit-Remaining"]),
+                int(headers.get("X-RateLimit-Reset", 0))
+            )
+        except ValueError:
+            return
+        with self.lock:
+            self.limits[resource] = limit
+
+    def retry_delay(self, response, attempt):
+        """
+        Returns how many seconds to wait before retrying a request, or None
+        if it shouldn't be retried.
+        """
+        if attempt >= self.retries:
+            return None
+
+        headers = response.headers
+        status = response.status_code
+        if status in (403, 429):
+            if "Retry-After" in headers:
+                delay = float(headers["Retry-After"])
+            elif headers.get("X-RateLimit-Remaining") == "0":
+                delay = int(headers.get("X-RateLimit-Reset", 0)) - time.time()
+            elif status == 429 or "rate limit" in response.text.lower():
+                # Secondary rate limits don't always say how long to wait
+                delay = self.backoff * 2 ** (attempt + 2)
+            else:
+                return None
+        elif status in TRANSIENT and response.request.method != "POST":
+            # A failed POST might still have created something
+            delay = self.backoff * 2 ** attempt
+        else:
+            return None
+
+        # Waiting for an hourly limit to reset isn't an option for a CLI
+        if delay > self.max_wait:
+            return None
+        return max(delay, 0.1)
+
+    def pause(self, delay):
+        """ Holds back every worker for the given number of seconds. """
+        with self.lock:
+            self.paused_until = max(
+                self.paused_until,
+                time.monotonic() + delay
+            )
+
+    def quota(self):
+        """ Returns a summary of the remaining quota per resource. """
+        return ", ".join(
+            "%s %i/%i (resets %s)" % (
+                resource,
+                remaining,
+                limit,
+                time.strftime("%H:%M", time.localtime(reset))
+            ) for resource, (limit, remaining, reset)
+            in sorted(self.limits.items())
+        )
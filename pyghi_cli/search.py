@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import math
+
+from .text import tokenize
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Title words count this many times, they say most about an issue
+TITLE_WEIGHT = 2
+
+class SearchIndex:
+    """
+    A BM25 ranked inverted index over the issues and comments of a Mirror,
+    stored in the mirror's database. Only the issues that changed since the
+    last update get tokenized again.
+    """
+    def __init__(self, mirror, stopwords):
+        self.mirror = mirror
+        self.db = mirror.db
+        self.stopwords = set(stopwords)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS search_postings (
+                term TEXT,
+                issue INTEGER,
+                tf INTEGER,
+                PRIMARY KEY (term, issue)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS search_postings_issue
+                ON search_postings (issue);
+            CREATE TABLE IF NOT EXISTS search_documents (
+                issue INTEGER PRIMARY KEY,
+                state TEXT,
+                length INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS issues_updated ON issues (updated_at);
+            CREATE INDEX IF NOT EXISTS comments_updated
+                ON comments (updated_at);
+        """)
+
+    def stale(self):
+        """ Returns the numbers of the issues changed since the last update. """
+        issues_since = self.mirror.get_meta("search_issues_since") or ""
+        comments_since = self.mirror.get_meta("search_comments_since") or ""
+        # >= because the API's timestamps only have a resolution of seconds
+        rows = self.db.execute(
+            "SELECT number FROM issues WHERE updated_at >= ? UNION "
+            "SELECT issue FROM comments WHERE updated_at >= ?",
+            (issues_since, comments_since)
+        )
+        return [row[0] for row in rows]
+
+    def terms(self, issue, comments):
+        """ Returns the term frequencies of an issue and its comments. """
+        words = tokenize(issue["title"], self.stopwords) * TITLE_WEIGHT
+        words += tokenize(issue["body"] or "", self.stopwords)
+        for comment in comments:
+            words += tokenize(comment["body"] or "", self.stopwords)
+
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        return counts
+
+    def update(self):
+        """ Reindexes the changed issues. Returns how many there were. """
+        synced_at = self.mirror.get_meta("synced_at")
+        if synced_at == self.mirror.get_meta("search_synced_at"):
+            return 0
+
+        numbers = self.stale()
+        postings = []
+        documents = []
+        for number in numbers:
+            issue = self.mirror.issue(number)
+            if issue == None:
+                continue # comments of an issue that hasn't been synced yet
+            counts = self.terms(issue, self.mirror.comments(number))
+            postings += [(term, number, tf) for term, tf in counts.items()]
+            documents.append((number, issue["state"], sum(counts.values())))
+
+        self.db.executemany(
+            "DELETE FROM search_postings WHERE issue = ?",
+            [(number,) for number in numbers]
+        )
+        self.db.executemany(
+            "DELETE FROM search_documents WHERE issue = ?",
+            [(number,) for number in numbers]
+        )
+        self.db.executemany(
+            "INSERT INTO search_postings VALUES (?, ?, ?)", postings
+        )
+        self.db.executemany(
+            "INSERT INTO search_documents VALUES (?, ?, ?)", documents
+        )
+
+        meta = [("search_synced_at", synced_at)]
+        for key, table in [("search_issues_since", "issues"),
+                ("search_comments_since", "comments")]:
+            row = self.db.execute(
+                "SELECT MAX(updated_at) FROM %s" % (table)
+            ).fetchone()
+            if row[0] != None:
+                meta.append((key, row[0]))
+        self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta)
+        self.db.commit()
+        return len(numbers)
+
+    def search(self, query, count=20, state="all"):
+        """
+        Returns up to count (issue number, score) pairs for the issues
+        matching any word of the query, best first.
+        """
+        terms = set(tokenize(query, self.stopwords))
+        documents, total = self.db.execute(
+            "SELECT COUNT(*), SUM(length) FROM search_documents"
+        ).fetchone()
+        if len(terms) == 0 or documents == 0:
+            return []
+
+        # Document frequencies ignore the state filter
+        placeholders = ", ".join("?" * len(terms))
+        rows = self.db.execute(
+            "SELECT term, COUNT(*) FROM search_postings "
+            "WHERE term IN (%s) GROUP BY term" % (placeholders),
+            list(terms)
+        ).fetchall()
+        if len(rows) == 0:
+            return []
+        params = {
+            "k1": K1,
+            "b": B,
+            "average": total / documents,
+            "state": state,
+            "count": count
+        }
+        for i, (term, df) in enumerate(rows):
+            params["term%i" % i] = term
+            params["idf%i" % i] = math.log(
+                1 + (documents - df + 0.5) / (df + 0.5)
+            )
+
+        # Summing up in SQLite saves a Python loop over every posting
+        sql = """
+            WITH query (term, idf) AS (VALUES %s)
+            SELECT p.issue, SUM(
+                query.idf * p.tf * (:k1 + 1) /
+                (p.tf + :k1 * (1 - :b + :b * d.length / :average))
+            ) AS score
+            FROM query
+            JOIN search_postings p ON p.term = query.term
+            JOIN search_documents d ON d.issue = p.issue
+            %s
+            GROUP BY p.issue
+            ORDER BY score DESC, p.issue DESC
+            LIMIT :count
+        """ % (
+            ", ".join("(:term%i, :idf%i)" % (i, i) for i in range(len(rows))),
+            "WHERE d.state = :state" if state != "all" else ""
+        )
+        return self.db.execute(sql, params).fetchall()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+from urllib.parse import urlparse, parse_qs
+
+API_URL = "https://api.github.com/"
+
+def create_session(config):
+    """
+    Creates a long-lived, connection-pooled session for the GitHub API.
+    Pool size, retries, backoff and authentication come from the config.
+    Only connection errors are retried here, error responses are left to
+    the scheduler.
+    """
+    # Only commands that talk to the API pay for importing requests
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.packages.urllib3.util.retry import Retry
+
+    session = requests.Session()
+
+    retries = Retry(
+        total=int(config.get("retries", 3)),
+        backoff_factor=float(config.get("backoff", 0.5)),
+        # Retry-After would otherwise be slept out in here, past max_wait
+        status=0,
+        status_forcelist=(),
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    pool_size = int(config.get("pool_size", 10))
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retries
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.headers.update({
+        "Accept": "application/vnd.github.v3+json",
+        "User-Agent": "PyGHI"
+    })
+
+    if "username" in config and "password" in config:
+        session.auth = (config["username"], config["password"])
+
+    return session
+
+def get_timeout(config):
+    """ Returns the (connect, read) timeout tuple from the config. """
+    timeout = config.get("timeout", [5, 30])
+    if isinstance(timeout, list):
+        return tuple(timeout)
+    return timeout
+
+def last_page(response):
+    """ Reads the number of the last page from a response's Link header. """
+    if "last" not in response.links:
+        return 1
+    query = parse_qs(urlparse(response.links["last"]["url"]).query)
+    return int(query.get("page", ["1"])[0])
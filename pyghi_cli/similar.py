@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import os
+
+import numpy
+
+from .text import tokenize
+
+class TfidfIndex:
+    """
+    TF-IDF vectors of a repository's issues, stored as a sparse CSR matrix
+    with L2-normalized rows so cosine similarity is a plain dot product.
+    """
+    def __init__(self, numbers, data, indices, indptr):
+        self.numbers = numbers
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.rows = {int(n): i for i, n in enumerate(numbers)}
+
+    @classmethod
+    def build(cls, issues, stopwords):
+        """ Builds the index from issue payloads. """
+        stopwords = set(stopwords)
+        vocabulary = {}
+        counts = []
+        for issue in issues:
+            text = "%s %s" % (issue["title"], issue["body"] or "")
+            doc = {}
+            for word in tokenize(text, stopwords):
+                column = vocabulary.setdefault(word, len(vocabulary))
+                doc[column] = doc.get(column, 0) + 1
+            counts.append(doc)
+
+        indptr = numpy.zeros(len(counts) + 1, dtype=numpy.int64)
+        indptr[1:] = numpy.cumsum([len(doc) for doc in counts])
+        indices = numpy.fromiter(
+            (column for doc in counts for column in doc),
+            dtype=numpy.int64,
+            count=int(indptr[-1])
+        )
+        tf = numpy.fromiter(
+            (count for doc in counts for count in doc.values()),
+            dtype=numpy.float64,
+            count=int(indptr[-1])
+        )
+
+        # Smoothed IDF with sublinear TF
+        df = numpy.bincount(indices, minlength=len(vocabulary))
+        idf = numpy.log((1 + len(counts)) / (1 + df)) + 1
+        data = (1 + numpy.log(tf)) * idf[indices]
+
+        # Normalize rows
+        rows = numpy.repeat(numpy.arange(len(counts)), numpy.diff(indptr))
+        norms = numpy.sqrt(numpy.bincount(
+            rows,
+            weights=data * data,
+            minlength=len(counts)
+        ))
+        norms[norms == 0] = 1
+        data /= norms[rows]
+
+        numbers = numpy.array([x["number"] for x in issues], dtype=numpy.int64)
+        return cls(numbers, data, indices, indptr)
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        """ Loads a saved index, or returns None if it's missing or stale. """
+        try:
+            with numpy.load(path) as f:
+                if str(f["fingerprint"]) != fingerprint:
+                    return None
+                return cls(f["numbers"], f["data"], f["indices"], f["indptr"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path, fingerprint):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            numpy.savez(
+                f,
+                fingerprint=numpy.array(fingerprint),
+                numbers=self.numbers,
+                data=self.data,
+                indices=self.indices,
+                indptr=self.indptr
+            )
+
+    def similar(self, number, count=10):
+        """
+        Returns up to count (number, score) tuples of the issues most similar
+        to the given one, best first, or None if the issue isn't indexed.
+        """
+        if number not in self.rows:
+            return None
+        row = self.rows[number]
+        start, end = self.indptr[row], self.indptr[row + 1]
+
+        # Densify the query and score every row at once
+        query = numpy.zeros(int(self.indices.max()) + 1 if len(self.indices)
+            else 1)
+        query[self.indices[start:end]] = self.data[start:end]
+        products = self.data * query[self.indices]
+
+        scores = numpy.zeros(len(self.numbers))
+        nonempty = numpy.diff(self.indptr) > 0
+        if len(products) > 0:
+            sums = numpy.add.reduceat(products, self.indptr[:-1][nonempty])
+            scores[nonempty] = sums
+        scores[row] = -1
+
+        count = min(count, len(scores) - 1)
+        if count <= 0:
+            return []
+        best = numpy.argpartition(-scores, count - 1)[:count]
+        best = best[numpy.argsort(-scores[best], kind="stable")]
+        return [
+            (int(self.numbers[i]), float(scores[i]))
+            for i in best if scores[i] > 0
+        ]
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+
+import re
+
+WORD = re.compile(r"[a-z0-9_]+")
+
+def tokenize(text, stopwords):
+    """ Splits text into lowercase words, dropping stopwords. """
+    return [
+        word for word in WORD.findall(text.lower())
+        if len(word) > 1 and word not in stopwords
+    ]
@@ -1,14 +1,14 @@
 #!/usr/bin/env python3
 
+from .model import Model, UNSET
 from .helpers import stylize
 
-class User:
+class User(Model):
     """ Class holding methods to format GH user information. """
-    def __init__(self, master, data):
-        self.master = master
-        for key in data.keys():
-            setattr(self, key, data[key])
+    __slots__ = ("_name",)
 
     def print_name(self):
         """ Prints the coloured name of the user. """
-        return stylize(self.login, fg=0xFFFF00, bold=True)
+        if self._name is UNSET:
+            self._name = stylize(self.login, fg=0xFFFF00, bold=True)
+        return self._name
@@ -20,6 +20,10 @@ setup(
   packages = ["pyghi_cli"],
   scripts = ["scripts/pyghi"],
   install_requires = requirements,
+  python_requires = ">=3.7",
+  extras_require = {
+    "similar": ["numpy"]
+  },
 
   author = "Felix \"KoffeinFlummi\" Wiegand",
   author_email = "koffeinflummi@gmail.com",
@@ -35,10 +39,9 @@ setup(
     "Operating System :: OS Independent",
     "Natural Language :: English",
     "Programming Language :: Python :: 3",
-    "Programming Language :: Python :: 3.0",
-    "Programming Language :: Python :: 3.1",
-    "Programming Language :: Python :: 3.2",
-    "Programming Language :: Python :: 3.3",
+    "Programming Language :: Python :: 3.7",
+    "Programming Language :: Python :: 3.8",
+    "Programming Language :: Python :: 3.9",
     "Topic :: Terminals :: Terminal Emulators/X Terminals",
     "Topic :: Utilities"
   ]
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import sys
 import subprocess
+import tempfile
 import string
 import random
+import time
 
 def randomstring(size=6, chars=string.ascii_uppercase + string.digits):
     # SOURCE: http://stackoverflow.com/a/2257449/3497501
@@ -17,10 +20,21 @@ testargs = [
     ["pyghi", "list", "-a", "KoffeinFlummi", "-m", "1"],
     ["pyghi", "list", "-c", "KoffeinFlummi", "--shortlabels"],
     ["pyghi", "list", "--nocomments", "--nolabels"],
+    ["pyghi", "list", "--prs", "--all"],
+    ["pyghi", "list", "--all", "--limit", "150"],
+    ["pyghi", "list", "--all", "--duplicates"],
+    ["pyghi", "list", "--where", "label:bug OR comments>2 AND -is:pr", "--sort", "comments"],
     ["pyghi", "show", "1"],
+    ["pyghi", "list", "--all", "--format", "csv"],
+    ["pyghi", "show", "1", "--format", "jsonl"],
     ["pyghi", "milestone"],
+    ["pyghi", "milestone", "--format", "tsv"],
     ["pyghi", "milestone", "--closed"],
-    ["pyghi", "label"]
+    ["pyghi", "label"],
+    ["pyghi", "sync"],
+    ["pyghi", "list", "--offline"],
+    ["pyghi", "show", "1", "--offline"],
+    ["pyghi", "search", "issue", "-s", "closed"]
 ]
 if writeaccess:
     testargs.append(["pyghi", "edit", "1", "-t", "Testing Issue %s" % (randomstring())])
@@ -30,6 +44,18 @@ if writeaccess:
     #testargs.append(["pyghi", "assign", "--none"])
     #testargs.append(["pyghi", "assign", "--me"])
     testargs.append(["pyghi", "comment", "1", randomstring()])
+    # The GraphQL backend needs authentication
+    testargs.append(["pyghi", "--backend", "graphql", "list", "--all"])
+    testargs.append(["pyghi", "--backend", "graphql", "show", "1"])
+
+    batchfile = tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False)
+    batchfile.write("open 1\n")
+    batchfile.write('{"op": "comment", "issue": 1, "body": "%s"}\n' % (
+        randomstring()
+    ))
+    batchfile.write("close 1\n")
+    batchfile.close()
+    testargs.append(["pyghi", "batch", batchfile.name])
 
 total = len(testargs)
 for i in range(len(testargs)):
@@ -47,4 +73,30 @@ for i in range(len(testargs)):
     else:
         print("done.")
 
+# Listing must cost exactly one request per page, comment counts included
+print("Testing requests per page of pyghi list ...", end=" ")
+sys.stdout.flush()
+output = subprocess.check_output(["pyghi", "--verbose", "list", "--all"])
+match = re.search(r"Requests: (\d+) \((\d+) pages,", output.decode())
+if match == None or match.group(1) != match.group(2):
+    print("FAILED.")
+    sys.exit(1)
+print("done.")
+total += 1
+
+# The same commands must work through the daemon
+print("Testing pyghi daemon ...", end=" ")
+sys.stdout.flush()
+daemon = subprocess.Popen(["pyghi", "daemon", "--idle", "1"],
+    stdout=subprocess.PIPE)
+time.sleep(1)
+try:
+    for testarg in [["pyghi", "list"], ["pyghi", "show", "1"]]:
+        subprocess.check_call(testarg, stdout=subprocess.PIPE)
+finally:
+    subprocess.call(["pyghi", "daemon", "--stop"])
+    daemon.wait()
+print("done.")
+total += 1
+
 print("\nAll %i tests successfully completed." % (total))
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+import io
+import unittest
+from contextlib import redirect_stderr
+
+from test_batch import parser
+
+class LimitTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = parser()
+
+    def test_limits(self):
+        self.assertEqual(self.parser.parse_args(["list", "-n", "5"]).limit, 5)
+        self.assertEqual(self.parser.parse_args(["list", "-n", "0"]).limit, 0)
+        self.assertEqual(self.parser.parse_args(["list"]).limit, None)
+
+    def test_negative_limits_are_rejected(self):
+        for argv in [["list", "-n", "-3"], ["list", "--limit=-1"]]:
+            stderr = io.StringIO()
+            with self.assertRaises(SystemExit), redirect_stderr(stderr):
+                self.parser.parse_args(argv)
+            self.assertIn("must be 0 or more", stderr.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import types
+import unittest
+
+from pyghi_cli.arguments import build_parser, COMMAND_NAMES
+from pyghi_cli.batch import parse_operation, mutation
+
+def parser():
+    """ The full parser, built for a stand-in of PyGHI with write access. """
+    master = types.SimpleNamespace(config={"username": "octocat"})
+    for name in COMMAND_NAMES:
+        setattr(master, name, None)
+    return build_parser(master)
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = parser()
+
+    def payload(self, line):
+        return mutation(parse_operation(line, self.parser), "octo", "proj")
+
+    def test_commands_and_json_agree(self):
+        self.assertEqual(
+            self.payload("edit 13 -l bug,wontfix -m 2"),
+            self.payload('{"op": "edit", "issue": 13, "labels": '
+                '["bug", "wontfix"], "milestone": 2}')
+        )
+
+    def test_numbers_given_as_strings(self):
+        method, url, payload, description, number = self.payload(
+            '{"op": "close", "issue": "5"}'
+        )
+        self.assertEqual(url, "repos/octo/proj/issues/5")
+        self.assertEqual(number, 5)
+
+    def test_comment_takes_number_like_the_others(self):
+        method, url, payload, description, number = self.payload(
+            '{"op": "comment", "number": 3, "body": "-1 from me"}'
+        )
+        self.assertEqual(url, "repos/octo/proj/issues/3/comments")
+        self.assertEqual(payload, {"body": "-1 from me"})
+
+    def test_assign_none_unassigns(self):
+        for line in ["assign 3 none", "assign 3 --none",
+                '{"op": "assign", "issue": 3, "assignee": "none"}']:
+            self.assertEqual(self.payload(line)[2], {"assignee": ""})
+        self.assertEqual(self.payload("assign 3 bob")[2], {"assignee": "bob"})
+
+    def test_invalid_json_operations(self):
+        for line in [
+            '{"op": "close", "issue": "five"}',
+            '{"op": "close", "issue": true}',
+            '{"op": "close"}',
+            '{"op": "close", "issue": 1, "colour": "red"}',
+            '{"op": "close", "issue": 1, "title": "Closed"}',
+            '{"op": "edit", "issue": 1, "state": "gone"}',
+            '{"op": "edit", "issue": 1, "labels": [1]}',
+            '{"op": "delete", "issue": 1}'
+        ]:
+            with self.assertRaises(ValueError, msg=line):
+                parse_operation(line, self.parser)
+
+    def test_blank_lines_and_comments(self):
+        self.assertEqual(parse_operation("  \n", self.parser), None)
+        self.assertEqual(parse_operation("# close 1", self.parser), None)
+
+if __name__ == "__main__":
+    unittest.main()
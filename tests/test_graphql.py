@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import subprocess
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def node(number, title, created, pr=False):
+    return {
+        "__typename": "PullRequest" if pr else "Issue",
+        "id": "I%i" % (number),
+        "number": number,
+        "title": title,
+        "state": "OPEN",
+        "url": "https://github.com/octo/proj/issues/%i" % (number),
+        "createdAt": created,
+        "updatedAt": created,
+        "author": {"login": "octocat"},
+        "assignees": {"nodes": []},
+        "labels": {"nodes": [{"id": "L1", "name": "bug", "color": "fc2929"}]},
+        "commentCount": {"totalCount": 1},
+        "body": "Body of %i" % (number),
+        "milestone": None
+    }
+
+ISSUES = [
+    node(3, "Parser crashes", "2024-01-03T10:00:00Z"),
+    node(1, "Login is slow", "2024-01-01T10:00:00Z")
+]
+PRS = [node(2, "Speed up login", "2024-01-02T10:00:00Z", pr=True)]
+
+class GraphQLStub(BaseHTTPRequestHandler):
+    """ Answers the queries of the GraphQL backend with a few issues. """
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(
+            self.rfile.read(int(self.headers["Content-Length"]))
+        )
+        self.server.queries.append(request)
+        if self.server.broken:
+            return self.reply(b"<html>Bad gateway</html>")
+
+        query, variables = request["query"], request["variables"]
+        if "issueOrPullRequest" in query:
+            issue = dict(ISSUES[1], comments={
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [{
+                    "id": "C1",
+                    "body": "Me too",
+                    "createdAt": "2024-01-04T10:00:00Z",
+                    "updatedAt": "2024-01-04T10:00:00Z",
+                    "author": None
+                }]
+            })
+            data = {"repository": {"issueOrPullRequest": issue}}
+        else:
+            # One node per page, so the cursors get followed
+            connection = "pullRequests" if "pullRequests(" in query \
+                else "issues"
+            nodes = PRS if connection == "pullRequests" else ISSUES
+            after = int(variables.get("after") or 0)
+            data = {"repository": {connection: {
+                "pageInfo": {
+                    "hasNextPage": after + 1 < len(nodes),
+                    "endCursor": str(after + 1)
+                },
+                "nodes": nodes[after:after + 1]
+            }}}
+        self.reply(json.dumps({"data": data}).encode("utf-8"))
+
+    def reply(self, body):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class GraphQLBackendTest(unittest.TestCase):
+    """ Runs list and show with --backend graphql against a local stub. """
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), GraphQLStub)
+        self.server.queries = []
+        self.server.broken = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.home = tempfile.mkdtemp()
+        self.configure(self.server.server_port)
+        self.repo = os.path.join(self.home, "proj")
+        os.mkdir(self.repo)
+        subprocess.check_call(["git", "init", "-q", self.repo])
+        subprocess.check_call(["git", "-C", self.repo, "remote", "add",
+            "origin", "https://github.com/octo/proj.git"])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.home)
+
+    def configure(self, port):
+        with open(os.path.join(self.home, ".pyghiconf"), "w") as f:
+            json.dump({
+                "username": "octocat",
+                "password": "secret",
+                "api_url": "http://127.0.0.1:%i/" % (port),
+                "backend": "graphql",
+                "retries": 0
+            }, f)
+
+    def pyghi(self, *args):
+        env = dict(os.environ,
+            HOME=self.home,
+            XDG_CACHE_HOME=os.path.join(self.home, ".cache"),
+            PYTHONPATH=ROOT,
+            PYGHI_NO_DAEMON="1",
+            LINES="40",
+            COLUMNS="100"
+        )
+        return subprocess.run(
+            [sys.executable, os.path.join(ROOT, "scripts", "pyghi")] +
+                list(args),
+            cwd=self.repo,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+
+    def test_list_merges_issues_and_prs_newest_first(self):
+        result = self.pyghi("list", "--all", "--format", "jsonl")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        issues = [json.loads(x) for x in result.stdout.splitlines()]
+        self.assertEqual([x["number"] for x in issues], [3, 2, 1])
+        self.assertIn("pull_request", issues[1])
+        self.assertEqual(issues[0]["labels"][0]["name"], "bug")
+        self.assertEqual(issues[0]["user"]["login"], "octocat")
+        # Two pages of issues and one of PRs
+        self.assertEqual(len(self.server.queries), 3)
+        variables = self.server.queries[0]["variables"]
+        self.assertEqual((variables["owner"], variables["repo"]),
+            ("octo", "proj"))
+
+    def test_show_gets_comments_in_the_same_query(self):
+        result = self.pyghi("show", "1", "--format", "jsonl")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        posts = [json.loads(x) for x in result.stdout.splitlines()]
+        self.assertEqual(posts[0]["title"], "Login is slow")
+        self.assertEqual(posts[1]["body"], "Me too")
+        self.assertEqual(posts[1]["user"]["login"], "ghost")
+        self.assertEqual(len(self.server.queries), 1)
+        self.assertEqual(self.server.queries[0]["variables"]["number"], 1)
+
+    def test_unreachable_server(self):
+        # Nothing listens on port 1
+        self.configure(1)
+        result = self.pyghi("list")
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Couldn't connect to GitHub.", result.stdout)
+        self.assertNotIn("Traceback", result.stderr)
+
+    def test_response_that_isnt_json(self):
+        self.server.broken = True
+        result = self.pyghi("show", "1")
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Couldn't parse GitHub response.", result.stdout)
+        self.assertNotIn("Traceback", result.stderr)
+
+if __name__ == "__main__":
+    unittest.main()
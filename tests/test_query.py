@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import calendar
+import unittest
+
+from pyghi_cli.query import parse, compile_tree, pushdown, date_condition, \
+    parse_sort, sort
+
+# A fixed "now" for ages: 2024-03-01T00:00:00Z
+NOW = calendar.timegm((2024, 3, 1, 0, 0, 0))
+
+def issue(number, labels=(), state="open", comments=0, updated=None,
+        pr=False, assignee=None):
+    data = {
+        "number": number,
+        "title": "Issue %i" % (number),
+        "state": state,
+        "labels": [{"name": x} for x in labels],
+        "comments": comments,
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": updated or "2024-01-01T00:00:00Z",
+        "user": {"login": "octocat"},
+        "assignee": {"login": assignee} if assignee else None,
+        "milestone": None
+    }
+    if pr:
+        data["pull_request"] = {}
+    return data
+
+def term(field, op, value):
+    return ("term", field, op, value)
+
+class ParseTest(unittest.TestCase):
+    def test_and_binds_tighter_than_or(self):
+        self.assertEqual(
+            parse("label:bug OR label:crash AND comments>2"),
+            ("or", [
+                term("label", ":", "bug"),
+                ("and", [
+                    term("label", ":", "crash"),
+                    term("comments", ">", "2")
+                ])
+            ])
+        )
+
+    def test_and_may_be_left_out(self):
+        self.assertEqual(
+            parse("label:bug label:ui"),
+            parse("label:bug AND label:ui")
+        )
+
+    def test_parentheses(self):
+        self.assertEqual(
+            parse("(label:a OR label:b) comments>2"),
+            ("and", [
+                ("or", [term("label", ":", "a"), term("label", ":", "b")]),
+                term("comments", ">", "2")
+            ])
+        )
+
+    def test_not_and_minus(self):
+        self.assertEqual(parse("NOT label:bug"),
+            ("not", term("label", ":", "bug")))
+        self.assertEqual(parse("-label:bug"), parse("not label:bug"))
+        self.assertEqual(parse("NOT NOT is:pr"),
+            ("not", ("not", term("is", ":", "pr"))))
+
+    def test_aliases_and_quotes(self):
+        self.assertEqual(parse('labels:"help wanted"'),
+            term("label", ":", "help wanted"))
+        self.assertEqual(parse("creator:bob"), term("author", ":", "bob"))
+
+    def test_errors(self):
+        for text in [
+            "",
+            "label:bug AND",
+            "(label:bug",
+            "label:bug)",
+            "OR label:bug",
+            "bug",
+            "colour:red",
+            "comments:many",
+            "updated<yesterday",
+            "label>bug",
+            "state:merged",
+            "is:draft",
+            "milestone:v1"
+        ]:
+            with self.assertRaises(ValueError, msg=text):
+                parse(text)
+
+class CompileTest(unittest.TestCase):
+    def matching(self, text, issues):
+        function = compile_tree(parse(text), NOW)
+        return [x["number"] for x in issues if function(x)]
+
+    def test_precedence_when_matching(self):
+        issues = [
+            issue(1, ["bug"]),
+            issue(2, ["crash"], comments=5),
+            issue(3, ["crash"]),
+            issue(4, ["bug"], comments=5)
+        ]
+        self.assertEqual(
+            self.matching("label:bug OR label:crash comments>2", issues),
+            [1, 2, 4]
+        )
+        self.assertEqual(
+            self.matching("(label:bug OR label:crash) comments>2", issues),
+            [2, 4]
+        )
+
+    def test_not(self):
+        issues = [issue(1, pr=True), issue(2), issue(3, state="closed")]
+        self.assertEqual(self.matching("-is:pr", issues), [2, 3])
+        self.assertEqual(self.matching("NOT (is:pr OR is:closed)", issues),
+            [2])
+
+    def test_ages_flip_the_comparison(self):
+        issues = [
+            issue(1, updated="2024-02-28T12:00:00Z"), # 12 hours old
+            issue(2, updated="2024-02-20T00:00:00Z"), # 10 days old
+        ]
+        # Younger than a week is updated after a week ago
+        self.assertEqual(self.matching("updated<7d", issues), [1])
+        self.assertEqual(self.matching("updated>7d", issues), [2])
+        self.assertEqual(self.matching("updated:7d", issues), [1])
+
+    def test_dates(self):
+        issues = [
+            issue(1, updated="2024-02-20T10:00:00Z"),
+            issue(2, updated="2024-02-21T10:00:00Z")
+        ]
+        self.assertEqual(self.matching("updated:2024-02-20", issues), [1])
+        self.assertEqual(self.matching("updated>2024-02-20", issues), [2])
+        self.assertEqual(self.matching("updated>=2024-02-20", issues), [1, 2])
+        self.assertEqual(self.matching("updated<=2024-02-20", issues), [1])
+
+    def test_date_condition(self):
+        self.assertEqual(date_condition("<", "1d", NOW),
+            (">", "2024-02-29T00:00:00Z"))
+        self.assertEqual(date_condition(">=", "1d", NOW),
+            ("<=", "2024-02-29T00:00:00Z"))
+        self.assertEqual(date_condition(":", "2024-02-20", NOW), None)
+
+    def test_assignee(self):
+        issues = [issue(1, assignee="Bob"), issue(2)]
+        self.assertEqual(self.matching("assignee:bob", issues), [1])
+        self.assertEqual(self.matching("assignee:none", issues), [2])
+        self.assertEqual(self.matching("assignee:*", issues), [1])
+
+class PushdownTest(unittest.TestCase):
+    def test_terms_every_match_satisfies(self):
+        tree = parse("label:bug label:ui is:open author:bob milestone:3 "
+            "updated<7d")
+        self.assertEqual(pushdown(tree, {}, NOW), {
+            "labels": "bug,ui",
+            "state": "open",
+            "creator": "bob",
+            "milestone": 3,
+            "since": "2024-02-23T00:00:00Z"
+        })
+
+    def test_nothing_under_or_or_not(self):
+        for text in [
+            "label:bug OR label:ui",
+            "NOT label:bug",
+            "-state:open",
+            "-author:bob",
+            "(label:bug OR is:closed) NOT milestone:3"
+        ]:
+            self.assertEqual(pushdown(parse(text), {}, NOW), {}, msg=text)
+
+    def test_only_since_for_lower_bounds(self):
+        for text in ["updated>7d", "updated<2024-01-01", "created<7d",
+                "updated:2024-01-01"]:
+            self.assertEqual(pushdown(parse(text), {}, NOW), {}, msg=text)
+
+    def test_keeps_what_is_there(self):
+        params = {"labels": "ui", "state": "closed", "creator": "alice"}
+        pushdown(parse("label:bug state:open author:bob"), params, NOW)
+        self.assertEqual(params, {
+            "labels": "ui,bug",
+            "state": "closed",
+            "creator": "alice"
+        })
+
+class SortTest(unittest.TestCase):
+    def test_keys(self):
+        self.assertEqual(parse_sort("comments,number-asc"),
+            [("comments", True), ("number", False)])
+        for text in ["votes", "number-up"]:
+            with self.assertRaises(ValueError, msg=text):
+                parse_sort(text)
+
+    def test_several_keys(self):
+        issues = [issue(1, comments=2), issue(2, comments=5),
+            issue(3, comments=2)]
+        sort(issues, parse_sort("comments,number-asc"))
+        self.assertEqual([x["number"] for x in issues], [2, 1, 3])
+
+if __name__ == "__main__":
+    unittest.main()
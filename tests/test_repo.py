@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+from pyghi_cli.repo import resolve, RepoCache
+
+class ResolveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.repo = os.path.join(self.tmp, "proj")
+        self.git("init", "-q", "-b", "main", self.repo)
+        self.git("remote", "add", "origin", "git@github.com:octo/proj.git")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def git(self, *args):
+        env = dict(os.environ, HOME=self.tmp, GIT_CONFIG_NOSYSTEM="1")
+        cwd = self.repo if os.path.isdir(self.repo) else self.tmp
+        identity = ["-c", "user.name=PyGHI", "-c", "user.email=pyghi@localhost"]
+        subprocess.check_call(
+            ["git"] + identity + list(args),
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.DEVNULL
+        )
+
+    def test_subdirectory(self):
+        path = os.path.join(self.repo, "docs", "api")
+        os.makedirs(path)
+        self.assertEqual(resolve(path), ("octo", "proj"))
+
+    def test_remote_order(self):
+        self.git("remote", "add", "upstream", "https://github.com/up/proj")
+        self.git("remote", "add", "fork", "https://github.com/me/proj.git/")
+        self.assertEqual(resolve(self.repo), ("octo", "proj"))
+        self.assertEqual(resolve(self.repo, "fork"), ("me", "proj"))
+
+        # The current branch's remote goes first
+        self.git("config", "branch.main.remote", "fork")
+        self.assertEqual(resolve(self.repo), ("me", "proj"))
+
+        self.git("config", "--unset", "branch.main.remote")
+        self.git("remote", "remove", "origin")
+        self.assertEqual(resolve(self.repo), ("up", "proj"))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            resolve(self.repo, "nonexistent")
+        self.git("remote", "set-url", "origin", "https://gitlab.com/octo/proj")
+        with self.assertRaises(ValueError):
+            resolve(self.repo)
+        with self.assertRaises(ValueError):
+            resolve(self.tmp)
+
+    def test_worktree_uses_the_common_config(self):
+        self.git("commit", "-q", "--allow-empty", "-m", "Initial commit")
+        self.git("remote", "add", "fork", "https://github.com/me/proj.git")
+        self.git("config", "branch.feature.remote", "fork")
+        worktree = os.path.join(self.tmp, "feature")
+        self.git("worktree", "add", "-q", "-b", "feature", worktree)
+
+        # Its own HEAD picks the branch, the main config the remote
+        self.assertEqual(resolve(worktree), ("me", "proj"))
+        self.assertEqual(resolve(self.repo), ("octo", "proj"))
+
+    def test_git_file(self):
+        # Like a submodule's, a .git file points at the real git dir
+        gitdir = os.path.join(self.tmp, "modules", "proj")
+        shutil.move(os.path.join(self.repo, ".git"), gitdir)
+        with open(os.path.join(self.repo, ".git"), "w") as f:
+            f.write("gitdir: ../modules/proj\n")
+        self.assertEqual(resolve(self.repo), ("octo", "proj"))
+
+    def test_cache(self):
+        cache = RepoCache(os.path.join(self.tmp, "cache", "repos.json"))
+        self.assertEqual(resolve(self.repo, None, cache), ("octo", "proj"))
+        self.assertEqual(cache.get(self.repo, None), ("octo", "proj"))
+        self.assertEqual(cache.get(self.repo, "origin"), None)
+
+        # Changing the config invalidates the entry
+        self.git("remote", "set-url", "origin", "https://github.com/new/proj")
+        config = os.path.join(self.repo, ".git", "config")
+        os.utime(config, (1, 1))
+        self.assertEqual(cache.get(self.repo, None), None)
+        self.assertEqual(resolve(self.repo, None, cache), ("new", "proj"))
+
+        # Entries are kept on disk
+        cache = RepoCache(os.path.join(self.tmp, "cache", "repos.json"))
+        self.assertEqual(cache.get(self.repo, None), ("new", "proj"))
+
+if __name__ == "__main__":
+    unittest.main()
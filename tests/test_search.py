@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import os
+import math
+import shutil
+import tempfile
+import unittest
+
+from pyghi_cli.mirror import Mirror
+from pyghi_cli.search import SearchIndex, K1, B
+from pyghi_cli.stopwords import stopwords
+
+def issue(number, title, body, state="open", updated="2024-01-01T00:00:00Z"):
+    return {
+        "number": number,
+        "title": title,
+        "body": body,
+        "state": state,
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": updated
+    }
+
+def comment(id, number, body, updated="2024-01-01T00:00:00Z"):
+    return {
+        "id": id,
+        "issue_url": "https://api.github.com/repos/octo/proj/issues/%i" % (
+            number
+        ),
+        "body": body,
+        "created_at": updated,
+        "updated_at": updated
+    }
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mirror = Mirror(os.path.join(self.tmp, "mirror.db"))
+        self.mirror.store_issues([
+            issue(1, "Parser crashes", "The parser crashes on bad input",
+                updated="2024-01-01T00:00:00Z"),
+            issue(2, "Login is slow", "Logging in takes a minute", "closed",
+                updated="2024-01-02T00:00:00Z"),
+            issue(3, "Slow startup", None, updated="2024-01-03T00:00:00Z"),
+            issue(4, "Dark theme", "Add a dark theme",
+                updated="2024-01-04T00:00:00Z")
+        ])
+        self.mirror.store_comments([
+            comment(10, 3, "The parser is slow too", "2024-01-01T00:00:00Z"),
+            comment(11, 4, "Seconded", "2024-01-02T00:00:00Z")
+        ])
+        self.sync("2024-01-04T00:00:00Z")
+        self.index = SearchIndex(self.mirror, stopwords())
+        self.index.update()
+
+    def tearDown(self):
+        self.mirror.db.close()
+        shutil.rmtree(self.tmp)
+
+    def sync(self, synced_at):
+        self.mirror.set_meta("synced_at", synced_at)
+
+    def numbers(self, query, **kwargs):
+        return [n for n, score in self.index.search(query, **kwargs)]
+
+    def test_bm25_score(self):
+        # Words without stopwords, the title's count twice
+        lengths = {1: 2 * 2 + 4, 2: 2 * 2 + 3, 3: 2 * 2 + 2, 4: 2 * 2 + 4}
+        # "crashes": twice for #1's title, once for its body
+        average = sum(lengths.values()) / len(lengths)
+        idf = math.log(1 + (4 - 1 + 0.5) / (1 + 0.5))
+        tf = 3
+        expected = idf * tf * (K1 + 1) / (
+            tf + K1 * (1 - B + B * lengths[1] / average)
+        )
+        [(number, score)] = self.index.search("crashes")
+        self.assertEqual(number, 1)
+        self.assertAlmostEqual(score, expected)
+
+    def test_rarer_words_weigh_more(self):
+        # slow is in three issues (one via a comment), parser in two
+        self.assertEqual(self.numbers("slow parser"), [3, 1, 2])
+
+    def test_titles_count_twice(self):
+        self.mirror.store_issues([
+            issue(5, "Theme colors", "Red blue",
+                updated="2024-01-05T00:00:00Z"),
+            issue(6, "Colors palette", "Red theme",
+                updated="2024-01-05T00:00:00Z")
+        ])
+        self.sync("2024-01-05T00:00:00Z")
+        self.index.update()
+        numbers = self.numbers("theme")
+        self.assertLess(numbers.index(5), numbers.index(6))
+
+    def test_state_and_count(self):
+        self.assertEqual(self.numbers("slow", state="closed"), [2])
+        self.assertEqual(self.numbers("slow", state="open"), [3])
+        self.assertEqual(len(self.numbers("slow parser", count=1)), 1)
+
+    def test_no_matches(self):
+        self.assertEqual(self.index.search("unicorn"), [])
+        self.assertEqual(self.index.search("the and of"), [])
+
+    def test_only_changed_issues_are_reindexed(self):
+        self.assertEqual(self.index.update(), 0)
+
+        self.mirror.store_issues([issue(2, "Login is slow", "Fixed it",
+            "closed", updated="2024-01-06T00:00:00Z")])
+        self.mirror.store_comments([comment(12, 1, "Fixed the parser",
+            updated="2024-01-06T00:00:00Z")])
+        self.sync("2024-01-06T00:00:00Z")
+        # Timestamps only have seconds, so the newest issue (4) and comment
+        # (on 4) of the last update are looked at again
+        self.assertEqual(sorted(self.index.stale()), [1, 2, 4])
+        self.index.update()
+
+        self.assertEqual(self.numbers("fixed"), [2, 1])
+        self.assertEqual(self.numbers("seconded"), [4])
+        self.assertEqual(self.numbers("minute"), [])
+
+if __name__ == "__main__":
+    unittest.main()